@@ -1,82 +1,300 @@
 import streamlit as st
-from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient
-from azure.core.exceptions import ResourceNotFoundError  # Add this import
-import pymysql
-import pandas as pd
-import time
 import os
-import zipfile
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from io import BytesIO
-
-# Initialize connection to Azure Blob Storage
+import async_storage
+import backends
+import bulk_import
+import exports
+from db_pool import ConnectionPool
+from jobs import FAILED, JobQueue
+from blob_moves import MoveError, move_blobs, move_latency, recover_moved
+from zip_builder import ZipCache, selection_key
+from blob_cache import BlobContentCache
+from blob_upload import throughput_summary, upload_in_blocks
+from query_cache import cache_snapshots, departments_cache, manifest_cache, rejected_files_cache, users_cache
+from auth import DUMMY_HASH, TOKEN_TTL, hash_password, issue_token, validate_token, verify_password
+import manifest
+from rejections import (ensure_pending_counts, ensure_rejection_indexes, export_rejections, log_rejections,
+                        pending_rejections, resolve_rejections)
+from tracing import JsonLinesSink, span, start_metrics_server, traced, tracer
+
+# Storage and database settings are read from the environment when the clients are first
+# built (AZURE_STORAGE_CONNECTION_STRING, PORTAL_DB_HOST, PORTAL_DB_PORT, PORTAL_DB_USER,
+# PORTAL_DB_PASSWORD, PORTAL_DB_NAME); the values below are the fallbacks.
 connect_str = ""
-blob_service_client = BlobServiceClient.from_connection_string(connect_str)
+DB_HOST = ""
+DB_PORT = 3306
+DB_USER = "root"
+DB_PASSWORD = ""
+DB_NAME = "user_credentials"
+# Downloads are streamed in chunks of this size, which bounds per-blob memory when building zips.
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
 container_name = "placements-2024"
+# Run bulk storage operations on the asyncio client (azure.storage.blob.aio, needs aiohttp),
+# keeping up to async_storage.MAX_CONCURRENCY requests in flight instead of a few threads.
+ASYNC_STORAGE = False
 archive_container = "archive"
 reject_container = "reject"
+# Browsing reads the `files` manifest table, which every upload and move keeps in step with
+# Blob Storage; Admin > Reconcile File Manifest rebuilds it from a container scan.
+CONTAINER_STATUS = {
+    container_name: manifest.STATUS_ACTIVE,
+    archive_container: manifest.STATUS_ARCHIVED,
+    reject_container: manifest.STATUS_REJECTED,
+}
+FILES_PER_PAGE = 50
+
+# Archive, reject and zip operations run as jobs in a persistent local queue worked by
+# JOB_WORKERS threads, so they finish even if the user navigates away mid-run. Bulk moves are
+# split into jobs of MOVE_JOB_SIZE files so several workers can share one selection.
+JOB_DB_PATH = "portal_jobs.sqlite3"
+JOB_WORKERS = 4
+MOVE_JOB_SIZE = 200
+JOB_POLL_SECONDS = 1.0
+
+# Timings for every storage and DB helper are kept in memory for the admin Performance view
+# (open the app with ?perf=1). Optionally also append them to a JSON-lines file and/or serve
+# them in Prometheus text format on http://127.0.0.1:<METRICS_PORT>/metrics.
+TRACE_JSONL_PATH = None
+METRICS_PORT = None
+
+# Login sessions are carried in a signed token in the URL (?session=...), so a new tab or a
+# reconnect doesn't ask for the password again. The token only names the user and their
+# users.session_version; logging out bumps the version, revoking every copy of the URL. Set
+# SESSION_SECRET to a long random string shared by every app process.
+SESSION_SECRET = ""
+SESSION_TTL = TOKEN_TTL
+
+# Department/directory exports are written under EXPORT_SPOOL_DIR, downloading EXPORT_WORKERS
+# blobs at a time, and optionally copied to blobs in EXPORT_CONTAINER.
+EXPORT_SPOOL_DIR = "exports"
+EXPORT_CONTAINER = "exports"
+EXPORT_WORKERS = 8
+
+# Downloaded blob contents and finished zips are kept on local disk under these directories,
+# created on first use. Each app process empties them when it creates its caches, so give every
+# process its own.
+BLOB_CACHE_DIR = os.path.join("cache", "blobs")
+ZIP_CACHE_DIR = os.path.join("cache", "zips")
+
+# Directory placeholders created by a bulk department import are uploaded this many at a time.
+PLACEHOLDER_WORKERS = 16
 
 # Define user roles
 USER_ROLE_UPLOADER = "Uploader"
 USER_ROLE_ACCESSOR = "Accessor"
 USER_ROLE_MANAGER = "Manager"
 USER_ROLE_ADMIN = "Admin"
+USER_ROLES = [USER_ROLE_UPLOADER, USER_ROLE_ACCESSOR, USER_ROLE_MANAGER, USER_ROLE_ADMIN]
+
+def load_db_settings():
+    return {
+        "host": os.environ.get("PORTAL_DB_HOST", DB_HOST),
+        "port": int(os.environ.get("PORTAL_DB_PORT", DB_PORT)),
+        "user": os.environ.get("PORTAL_DB_USER", DB_USER),
+        "password": os.environ.get("PORTAL_DB_PASSWORD", DB_PASSWORD),
+        "database": os.environ.get("PORTAL_DB_NAME", DB_NAME),
+    }
+
+def get_storage_connection_string():
+    return backends.get("storage_connection_string",
+                        lambda: os.environ.get("AZURE_STORAGE_CONNECTION_STRING", connect_str))
 
 def get_db_connection():
+    # pymysql and the Azure SDK are imported on first use rather than at the top of this script,
+    # which Streamlit executes on every process start.
+    import pymysql
+
     return pymysql.connect(
-        host="",
-        user="root",
-        password="",
-        database="user_credentials",
+        **backends.get("db_settings", load_db_settings),
         charset='utf8mb4',
         cursorclass=pymysql.cursors.DictCursor
     )
 
+# The storage client, DB connect function and pool are resolved through backends, so one
+# instance per server process is shared by every session and rerun, and fakes can be swapped in.
+def create_blob_service_client():
+    from azure.storage.blob import BlobServiceClient
+
+    return BlobServiceClient.from_connection_string(
+        get_storage_connection_string(), max_single_get_size=DOWNLOAD_CHUNK_SIZE,
+        max_chunk_get_size=DOWNLOAD_CHUNK_SIZE)
+
+def get_blob_service_client():
+    return backends.get("blob_service_client", create_blob_service_client)
+
+def create_async_blob_service_client():
+    from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+    return AsyncBlobServiceClient.from_connection_string(
+        get_storage_connection_string(), max_single_get_size=DOWNLOAD_CHUNK_SIZE, max_chunk_get_size=DOWNLOAD_CHUNK_SIZE)
+
+def get_async_blob_service_client():
+    return backends.get("async_blob_service_client", create_async_blob_service_client)
+
+def create_db_pool():
+    connect = traced("mysql.connect", kind="db")(backends.get("db_connect", lambda: get_db_connection))
+    pool = ConnectionPool(connect, max_size=10, max_idle=300)
+    with pool.connection() as connection:
+        ensure_rejection_indexes(connection)
+        ensure_pending_counts(connection)
+        manifest.ensure_table(connection)
+        ensure_session_version(connection)
+    return pool
+
+def get_db_pool():
+    return backends.get("db_pool", create_db_pool)
+
+def db_connection():
+    return get_db_pool().connection()
+
+def start_trace_exporters():
+    if TRACE_JSONL_PATH:
+        tracer.add_sink(JsonLinesSink(TRACE_JSONL_PATH))
+    if METRICS_PORT:
+        return start_metrics_server(METRICS_PORT)
+
 def load_departments_from_db():
-    connection = get_db_connection()
-    try:
+    return departments_cache.get_or_load("all", query_departments)
+
+@traced("mysql.departments", kind="db")
+def query_departments():
+    with db_connection() as connection:
         with connection.cursor() as cursor:
             sql = "SELECT name FROM departments"
             cursor.execute(sql)
             departments = [row['name'] for row in cursor.fetchall()]
             return departments
-    finally:
-        connection.close()
 
 def get_rejected_files(roll_number):
-    connection = get_db_connection()
-    try:
+    return rejected_files_cache.get_or_load(roll_number, lambda: query_rejected_files(roll_number))
+
+@traced("mysql.rejected_files", kind="db")
+def query_rejected_files(roll_number):
+    with db_connection() as connection:
+        return pending_rejections(connection, roll_number)
+
+@traced("mysql.user_details", kind="db")
+def query_user(email):
+    with db_connection() as connection:
         with connection.cursor() as cursor:
-            sql = "SELECT file_name, reason FROM rejection_logs WHERE roll_number=%s AND resolved=0"
-            cursor.execute(sql, (roll_number,))
-            rejected_files = cursor.fetchall()
-            return rejected_files
-    finally:
-        connection.close()
+            sql = "SELECT password, role, name, roll_number, session_version FROM users WHERE email=%s"
+            cursor.execute(sql, (email,))
+            return cursor.fetchone()
 
 def get_user_details(email, password):
-    connection = get_db_connection()
-    try:
+    user = users_cache.get_or_load(email, lambda: query_user(email))
+    if user is None:
+        # Unknown emails cost as much as a wrong password, so response time doesn't reveal which accounts exist.
+        verify_password(password, DUMMY_HASH)
+        return None, None, None
+    matches, needs_rehash = verify_password(password, user['password'])
+    if not matches:
+        return None, None, None
+    if needs_rehash:
+        update_password_hash(email, hash_password(password))
+    return user['role'], user['name'], user['roll_number']
+
+@traced("mysql.update_password_hash", kind="db")
+def update_password_hash(email, password_hash):
+    with db_connection() as connection:
         with connection.cursor() as cursor:
-            sql = "SELECT role, name, roll_number FROM users WHERE email=%s AND password=%s"
-            cursor.execute(sql, (email, password))
-            result = cursor.fetchone()
-            if result:
-                return result['role'], result['name'], result['roll_number']
-            else:
-                return None, None, None
-    finally:
-        connection.close()
+            cursor.execute("UPDATE users SET password=%s WHERE email=%s", (password_hash, email))
+        connection.commit()
+    users_cache.invalidate(email)
 
+@traced("mysql.add_user", kind="db")
 def add_user(email, password, role, name, roll_number):
-    connection = get_db_connection()
-    try:
+    with db_connection() as connection:
         with connection.cursor() as cursor:
             sql = "INSERT INTO users (email, password, role, name, roll_number) VALUES (%s, %s, %s, %s, %s)"
-            cursor.execute(sql, (email, password, role, name, roll_number))
+            cursor.execute(sql, (email, hash_password(password), role, name, roll_number))
         connection.commit()
-    finally:
-        connection.close()
+    users_cache.invalidate(email)
+
+def import_users(file, file_name, progress=None):
+    # A connection is checked out per chunk, so progress (which redraws the page, and can be
+    # interrupted by a rerun) never runs while one is held.
+    report = bulk_import.import_users(db_connection, bulk_import.read_chunks(
+        file, file_name, bulk_import.REQUIRED_USER_COLUMNS), USER_ROLES, progress=progress)
+    users_cache.clear()
+    return report
+
+def import_departments(file, file_name, progress=None):
+    report = bulk_import.import_departments(db_connection, bulk_import.read_chunks(
+        file, file_name, bulk_import.REQUIRED_DEPARTMENT_COLUMNS), progress=progress)
+    departments_cache.invalidate("all")
+    create_directory_placeholders(get_blob_service_client().get_container_client(container_name),
+                                  report["directories"])
+    return report
+
+def get_session_secret():
+    # Without a configured SESSION_SECRET, tokens are signed with a per-process key and stop
+    # validating when the app restarts.
+    return backends.get("session_secret", lambda: SESSION_SECRET or secrets.token_urlsafe(32))
+
+def ensure_session_version(connection):
+    # users.session_version is bumped on logout, revoking every token issued before it.
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW COLUMNS FROM users")
+        if "session_version" not in {row["Field"] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE users ADD COLUMN session_version INT NOT NULL DEFAULT 0")
+    connection.commit()
+
+def issue_session_token(email):
+    user = users_cache.get_or_load(email, lambda: query_user(email))
+    return issue_token(get_session_secret(), {"email": email, "ver": user["session_version"]}, ttl=SESSION_TTL)
+
+def load_session(token):
+    # Returns the user's current row for a valid, unrevoked token, else None. The role and name
+    # come from the users table rather than the token, so a demoted or deleted user loses access.
+    # The row is read uncached, one query per restore: users_cache is per process, so a cached
+    # row could outlive a logout or role change made through another app process by its TTL.
+    claims = validate_token(get_session_secret(), token)
+    if claims is None:
+        return None
+    user = query_user(claims.get("email"))
+    if user is None or user["session_version"] != claims.get("ver"):
+        return None
+    return dict(user, email=claims["email"])
+
+@traced("mysql.end_session", kind="db")
+def end_session(email):
+    with db_connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE users SET session_version = session_version + 1 WHERE email=%s", (email,))
+        connection.commit()
+    users_cache.invalidate(email)
+
+def start_session(email, role, name, roll_number):
+    st.session_state.user_email = email
+    st.session_state.user_role = role
+    st.session_state.user_name = name
+    st.session_state.roll_number = roll_number
+
+def restore_session():
+    # A new tab or a reconnect carries the signed token in the URL; its signature is checked
+    # locally and its version against the users table.
+    token = st.experimental_get_query_params().get("session", [None])[0]
+    user = load_session(token) if token else None
+    if user is None:
+        if token:
+            set_session_token(None)
+        return False
+    start_session(user["email"], user["role"], user["name"], user["roll_number"])
+    return True
 
+def set_session_token(token):
+    params = st.experimental_get_query_params()
+    params.pop("session", None)
+    if token:
+        params["session"] = token
+    st.experimental_set_query_params(**params)
+
+@traced("blob.exists", kind="storage")
 def check_file_exists(container_client, blob_name):
     try:
         container_client.get_blob_client(blob_name).get_blob_properties()
@@ -84,65 +302,228 @@ def check_file_exists(container_client, blob_name):
     except:
         return False
 
-def upload_file(container_client, file, blob_name):
+def record_files(container, entries):
+    with db_connection() as connection:
+        manifest.upsert_files(connection, container, CONTAINER_STATUS[container], entries)
+    manifest_cache.clear()
+
+@traced("blob.upload_file", kind="storage", measure=lambda result: result.size)
+def upload_file(container_client, file, blob_name, progress=None):
+    # Staged in parallel MD5-checked blocks; re-uploading after a failure resumes from the staged blocks.
+    # A file whose SHA-256 matches the one already recorded for this blob isn't sent again.
     blob_client = container_client.get_blob_client(blob_name)
-    blob_client.upload_blob(file, overwrite=True)
+    with db_connection() as connection:
+        existing = manifest.file_entry(connection, container_client.container_name, blob_name)
+    result = upload_in_blocks(blob_client, file, content_type=getattr(file, "type", None), progress=progress,
+                              existing=existing)
+    record_upload(container_client.container_name, blob_name,
+                  {"size": result.size, "etag": result.etag, "last_modified": result.last_modified,
+                   "sha256": result.sha256})
+    return result
+
+@traced("mysql.files.record_upload", kind="db")
+def record_upload(container, blob_name, entry):
+    # The upload's manifest row and the resolution of any rejection of that same file commit together.
+    with db_connection() as connection:
+        manifest.upsert_files(connection, container, CONTAINER_STATUS[container], {blob_name: entry}, commit=False)
+        resolved = resolve_rejections(connection, [manifest.split_blob_name(blob_name)])
+    manifest_cache.clear()
+    if resolved:
+        rejected_files_cache.invalidate(*resolved)
+    return resolved
 
 def list_files(container_client, prefix):
-    blobs = container_client.list_blobs(name_starts_with=prefix)
-    return [blob.name for blob in blobs]
+    department, directory, roll_number, _ = manifest.split_blob_name(prefix)
+    key = ("files", container_client.container_name, department, directory, roll_number)
+    return list(manifest_cache.get_or_load(key, lambda: query_files(container_client.container_name, department,
+                                                                     directory, roll_number)))
 
-def list_roll_numbers(container_client, path_prefix):
-    roll_numbers = set()
-    blobs = container_client.list_blobs(name_starts_with=path_prefix)
-    for blob in blobs:
-        parts = blob.name.split('/')
-        if len(parts) > 2:
-            roll_numbers.add(parts[2])
-    return sorted(list(roll_numbers))
-
-def move_blob(source_client, dest_client, blob_name, new_blob_name):
-    source_blob = source_client.get_blob_client(blob_name)
-    dest_blob = dest_client.get_blob_client(new_blob_name)
-    copy = dest_blob.start_copy_from_url(source_blob.url)
-
-    while True:
-        props = dest_blob.get_blob_properties()
-        if props.copy.status == 'success':
-            source_blob.delete_blob()
-            break
-        time.sleep(1)
-
-def log_rejection(roll_number, file_name, reason):
-    try:
-        df = pd.read_excel("rejections_log.xlsx")
-    except FileNotFoundError:
-        df = pd.DataFrame(columns=["Roll Number", "File Name", "Reason"])
-    new_entry = pd.DataFrame([[roll_number, file_name, reason]], columns=["Roll Number", "File Name", "Reason"])
-    df = pd.concat([df, new_entry], ignore_index=True)
-    df.to_excel("rejections_log.xlsx", index=False)
+@traced("mysql.files.list", kind="db")
+def query_files(container, department, directory, roll_number):
+    with db_connection() as connection:
+        return manifest.files(connection, container, department, directory, roll_number)
 
+def list_roll_numbers(container_client, path_prefix):
+    department, directory, _, _ = manifest.split_blob_name(path_prefix)
+    key = ("roll_numbers", container_client.container_name, department, directory)
+    return manifest_cache.get_or_load(key, lambda: query_roll_numbers(container_client.container_name, department,
+                                                                      directory))
+
+@traced("mysql.files.roll_numbers", kind="db")
+def query_roll_numbers(container, department, directory):
+    with db_connection() as connection:
+        return manifest.roll_numbers(connection, container, department, directory)
+
+def list_file_page(container_client, path_prefix, roll_prefix, after, page_size=FILES_PER_PAGE):
+    department, directory, _, _ = manifest.split_blob_name(path_prefix)
+    key = ("page", container_client.container_name, department, directory, roll_prefix, after, page_size)
+    return manifest_cache.get_or_load(key, lambda: query_file_page(container_client.container_name, department,
+                                                                   directory, roll_prefix, after, page_size))
+
+@traced("mysql.files.page", kind="db")
+def query_file_page(container, department, directory, roll_prefix, after, page_size):
+    with db_connection() as connection:
+        return manifest.file_page(connection, container, department, directory, roll_prefix, after, page_size)
+
+@traced("blob.download_as_bytes", kind="storage", measure=lambda stream: stream.getbuffer().nbytes)
 def download_blob_as_bytes(container_client, blob_name):
-    blob_client = container_client.get_blob_client(blob_name)
-    stream = BytesIO()
-    blob_client.download_blob().readinto(stream)
-    stream.seek(0)
+    # Served from the local content cache when the etag recorded in the manifest still matches.
+    with db_connection() as connection:
+        entry = manifest.file_entry(connection, container_client.container_name, blob_name)
+    with get_content_cache().open_blob(container_client, blob_name, etag=(entry or {}).get("etag")) as cached:
+        stream = BytesIO(cached.read())
     return stream
 
-def create_zip(files):
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED) as zip_file:
-        for file_name, file_stream in files:
-            zip_file.writestr(file_name, file_stream.read())
-    zip_buffer.seek(0)
-    return zip_buffer
-
-def display_timer(duration):
-    timer_placeholder = st.empty()
-    for i in range(duration, 0, -1):
-        timer_placeholder.write(f"Please wait... {i} seconds remaining")
-        time.sleep(1)
-    timer_placeholder.empty()
+@traced("blob.bulk_move", kind="storage")
+def move_and_record(source_container, dest_container, moves, sizes=None, rejections=None, progress=None):
+    # rejections maps a source blob name to its rejection_logs row; rows for the files that moved
+    # are written in the same transaction as their manifest update.
+    source_client = get_blob_service_client().get_container_client(source_container)
+    dest_client = get_blob_service_client().get_container_client(dest_container)
+    # A file whose destination already holds the same content (e.g. archived, re-uploaded
+    # unchanged, archived again) isn't copied a second time.
+    with span("mysql.files.duplicate_moves", kind="db"), db_connection() as connection:
+        duplicates = manifest.duplicate_moves(connection, source_container, dest_container, moves)
+    if ASYNC_STORAGE:
+        service = get_async_blob_service_client()
+        results = async_storage.move_many(service.get_container_client(source_container),
+                                          service.get_container_client(dest_container), moves, progress=progress,
+                                          duplicates=duplicates)
+    else:
+        results = move_blobs(source_client, dest_client, moves, sizes=sizes, progress=progress, duplicates=duplicates)
+
+    with span("mysql.files.record_moves", kind="db"), db_connection() as connection:
+        # Moves that finished before an interrupted attempt may already be recorded too.
+        recovered = recover_moved(source_client, dest_client, results)
+        already_recorded = {result.blob_name for result in recovered
+                            if manifest.file_entry(connection, dest_container, result.new_blob_name) is not None}
+        to_record = [result for result in results if result.ok and result.blob_name not in already_recorded]
+        rejected_rows = [rejections[result.blob_name] for result in to_record] if rejections else []
+        manifest.record_moves(connection, source_container, dest_container, CONTAINER_STATUS[dest_container],
+                              to_record, commit=not rejected_rows)
+        if rejected_rows:
+            log_rejections(connection, rejected_rows)
+    manifest_cache.clear()
+    if rejected_rows:
+        rejected_files_cache.invalidate(*{row[2] for row in rejected_rows})
+    return results
+
+def run_move_job(job):
+    # Retried jobs skip the files an earlier attempt already moved, and any file that was moved
+    # but not recorded before a crash is picked up by recover_moved rather than copied again.
+    payload = job.payload
+    moved = set(job.state.get("moved", []))
+    pending = [move for move in payload["moves"] if move[0] not in moved]
+    total = len(payload["moves"])
+    job.progress(len(moved), total, force=True)
+
+    rejections = None
+    if payload.get("reason"):
+        rejections = {}
+        for source_blob_name, _ in pending:
+            department, directory, roll_number, file_name = manifest.split_blob_name(source_blob_name)
+            rejections[source_blob_name] = (department, directory, roll_number, file_name, payload["reason"])
+    results = move_and_record(payload["source"], payload["dest"], pending, sizes=payload.get("sizes"),
+                              rejections=rejections, progress=lambda done, _, result: job.progress(len(moved) + done, total))
+
+    moved.update(result.blob_name for result in results if result.ok)
+    job.state["moved"] = sorted(moved)
+    job.state["bytes_saved"] = job.state.get("bytes_saved", 0) + sum(
+        result.size or 0 for result in results if result.ok and result.method == "deduplicated")
+    job.save_state()
+    failed = [{"blob_name": result.blob_name, "error": str(result.error)} for result in results if not result.ok]
+    outcome = {"moved": sorted(moved), "bytes_saved": job.state["bytes_saved"], "failed": failed}
+    if failed:
+        raise MoveError(f"{len(failed)} file(s) could not be moved", result=outcome)
+    return outcome
+
+def run_zip_job(job):
+    container_client = get_blob_service_client().get_container_client(job.payload["container"])
+    entries = {blob_name: dict(entry, last_modified=datetime.fromisoformat(entry["last_modified"])
+                               if entry.get("last_modified") else None)
+               for blob_name, entry in job.payload["entries"].items()}
+    key = selection_key(entries)
+    zip_cache = get_zip_cache()
+    path = zip_cache.get(key)
+    if path is None:
+        path = zip_cache.build(key, container_client, entries, content_cache=get_content_cache(),
+                               progress=lambda done, total, name: job.progress(done, total))
+    return {"path": path, "files": len(entries)}
+
+def run_export_job(job):
+    # Restartable: job.state records finished archives (per roll) or the last checkpoint of the
+    # combined archive, and which archives were already copied to the export container. The
+    # directory's files are read from the manifest once and kept in job.state, so a retry resumes
+    # against the same list even if files were moved in between. Each job writes to its own
+    # folder, so exports of the same directory with different options never share files.
+    payload = job.payload
+    department, directory = payload["department"], payload["directory"]
+    if "entries" not in job.state:
+        with db_connection() as connection:
+            entries, _ = manifest.file_page(connection, payload["container"], department, directory)
+        job.state["entries"] = {blob_name: dict(entry, last_modified=entry["last_modified"].isoformat()
+                                                if entry.get("last_modified") else None)
+                                for blob_name, entry in sorted(entries.items())}
+        job.save_state()
+    entries = {blob_name: dict(entry, last_modified=datetime.fromisoformat(entry["last_modified"])
+                               if entry.get("last_modified") else None)
+               for blob_name, entry in job.state["entries"].items()}
+    container_client = get_blob_service_client().get_container_client(payload["container"])
+    stats = exports.export_directory(
+        container_client, entries,
+        os.path.join(EXPORT_SPOOL_DIR, f"{department}_{directory}", f"{payload['layout']}-{job.id}"),
+        layout=payload["layout"], name=f"{department}_{directory}", state=job.state, checkpoint=job.save_state,
+        progress=job.progress, max_workers=EXPORT_WORKERS)
+    if payload["destination"] == "blob":
+        stats["blobs"] = exports.upload_archives(get_blob_service_client().get_container_client(EXPORT_CONTAINER),
+                                                 stats["archives"], f"{department}/{directory}/{payload['layout']}",
+                                                 state=job.state, checkpoint=job.save_state)
+    return stats
+
+def get_content_cache():
+    return backends.get("content_cache", lambda: BlobContentCache(BLOB_CACHE_DIR))
+
+def get_zip_cache():
+    return backends.get("zip_cache", lambda: ZipCache(ZIP_CACHE_DIR))
+
+def create_job_queue():
+    return JobQueue(JOB_DB_PATH, {"move": run_move_job, "zip": run_zip_job, "export": run_export_job},
+                    workers=JOB_WORKERS).start()
+
+def get_job_queue():
+    return backends.get("job_queue", create_job_queue)
+
+def submit_moves(source_container, dest_container, selected, reason=None):
+    moves = [[blob_name, blob_name] for blob_name in sorted(selected)]
+    payloads = [{"source": source_container, "dest": dest_container, "moves": moves[start:start + MOVE_JOB_SIZE],
+                 "sizes": {blob_name: selected[blob_name]["size"] for blob_name, _ in moves[start:start + MOVE_JOB_SIZE]},
+                 "reason": reason}
+                for start in range(0, len(moves), MOVE_JOB_SIZE)]
+    return get_job_queue().submit("move", payloads)
+
+def submit_zip(container, selected):
+    entries = {blob_name: {"size": entry.get("size"), "etag": entry.get("etag"),
+                           "last_modified": entry["last_modified"].isoformat() if entry.get("last_modified") else None}
+               for blob_name, entry in selected.items()}
+    return get_job_queue().submit("zip", [{"container": container, "entries": entries}])
+
+def submit_export(container, department, directory, layout, destination):
+    return get_job_queue().submit("export", [{"container": container, "department": department,
+                                              "directory": directory, "layout": layout, "destination": destination}])
+
+def watch_jobs(group_id, label):
+    # Returns the group's status once every job in it has finished; until then shows progress
+    # and reruns the page every JOB_POLL_SECONDS. Leaving the page does not stop the jobs.
+    status = get_job_queue().group(group_id)
+    if status["finished"]:
+        return status
+    st.progress(status["done"] / status["total"] if status["total"] else 0.0)
+    if status["total"]:
+        st.write(f"{label}: {status['done']} of {status['total']} file(s) processed.")
+    else:
+        st.write(f"{label}: waiting for a worker.")
+    time.sleep(JOB_POLL_SECONDS)
+    st.experimental_rerun()
 
 # Initialize session state attributes
 if 'user_email' not in st.session_state:
@@ -167,10 +548,8 @@ def login_page():
 
         if user_role:
             st.success("Logged in successfully!")
-            st.session_state.user_email = username
-            st.session_state.user_role = user_role
-            st.session_state.user_name = user_name
-            st.session_state.roll_number = roll_number
+            start_session(username, user_role, user_name, roll_number)
+            set_session_token(issue_session_token(username))
             return True
 
         st.error("Incorrect username or password. Please try again.")
@@ -178,33 +557,52 @@ def login_page():
     return False
 
 def create_directory_placeholder(container_client, directory_path):
-    blob_client = container_client.get_blob_client(f"{directory_path}/")
-    blob_client.upload_blob(b"", overwrite=True)
+    create_directory_placeholders(container_client, [directory_path])
+
+@traced("blob.create_directories", kind="storage")
+def create_directory_placeholders(container_client, directory_paths):
+    # Uploads the placeholder blobs concurrently and records them in one manifest write.
+    def create(directory_path):
+        response = container_client.get_blob_client(f"{directory_path}/").upload_blob(b"", overwrite=True)
+        return f"{directory_path}/", {"size": 0, "etag": response.get("etag"), "last_modified": response.get("last_modified")}
+
+    if not directory_paths:
+        return
+    with ThreadPoolExecutor(max_workers=min(PLACEHOLDER_WORKERS, len(directory_paths))) as pool:
+        entries = dict(pool.map(create, directory_paths))
+    record_files(container_client.container_name, entries)
 
 def load_directories(container_client, department):
-    directories = set()
-    blobs = container_client.list_blobs(name_starts_with=department)
-    for blob in blobs:
-        parts = blob.name.split('/')
-        if len(parts) > 1:
-            directories.add(parts[1])
-    return sorted(list(directories))
+    key = ("directories", container_client.container_name, department)
+    return manifest_cache.get_or_load(key, lambda: query_directories(container_client.container_name, department))
+
+@traced("mysql.files.directories", kind="db")
+def query_directories(container, department):
+    with db_connection() as connection:
+        return manifest.directories(connection, container, department)
+
+@traced("mysql.files.reconcile", kind="db")
+def reconcile_manifest(container, progress=None):
+    container_client = get_blob_service_client().get_container_client(container)
+    stats = manifest.reconcile(db_connection, container_client, CONTAINER_STATUS[container], progress=progress)
+    manifest_cache.clear()
+    return stats
 
 def log_rejection(department, directory, roll_number, file_name, reason):
-    connection = get_db_connection()
-    try:
-        with connection.cursor() as cursor:
-            sql = "INSERT INTO rejection_logs (department, directory, roll_number, file_name, reason, resolved) VALUES (%s, %s, %s, %s, %s, 0)"
-            cursor.execute(sql, (department, directory, roll_number, file_name, reason))
-        connection.commit()
-    finally:
-        connection.close()
+    log_rejection_batch([(department, directory, roll_number, file_name, reason)])
+
+@traced("mysql.log_rejections", kind="db")
+def log_rejection_batch(rows):
+    with db_connection() as connection:
+        logged = log_rejections(connection, rows)
+    rejected_files_cache.invalidate(*{row[2] for row in rows})
+    return logged
 
 def admin_page():
     st.title("Admin Page")
     
     # Create a dropdown menu to switch between different functionalities
-    option = st.selectbox("Select an option", ["Create New Directory", "Add New User", "Add Department"])
+    option = st.selectbox("Select an option", ["Create New Directory", "Add New User", "Add Department", "Bulk Import", "Export Rejection Log", "Reconcile File Manifest", "Diagnostics"])
 
     if option == "Create New Directory":
         st.header("Create New Directory")
@@ -216,7 +614,7 @@ def admin_page():
         if st.button("Create Directory", key="create_directory"):
             if new_directory:
                 # Save the new directory as a placeholder blob
-                container_client = blob_service_client.get_container_client(container_name)
+                container_client = get_blob_service_client().get_container_client(container_name)
                 directory_path = f"{department}/{new_directory}"
                 create_directory_placeholder(container_client, directory_path)
                 st.success(f"New directory '{new_directory}' created successfully under {department} department.")
@@ -228,7 +626,7 @@ def admin_page():
 
         new_user_email = st.text_input("New User Email", key="new_user_email")
         new_user_password = st.text_input("New User Password", type="password", key="new_user_password")
-        new_user_role = st.selectbox("Select Role", [USER_ROLE_UPLOADER, USER_ROLE_ACCESSOR, USER_ROLE_MANAGER, USER_ROLE_ADMIN], key="new_user_role")
+        new_user_role = st.selectbox("Select Role", USER_ROLES, key="new_user_role")
         new_user_name = st.text_input("New User Name", key="new_user_name")
         new_user_roll_number = st.text_input("New User Roll Number", key="new_user_roll_number")
 
@@ -239,82 +637,179 @@ def admin_page():
             else:
                 st.error("Please fill out all fields to add a new user.")
 
-    elif option == "Add Department":
-        st.header("Add Department")
-        new_department = st.text_input("Enter New Department Name")
     elif option == "Add Department":
         st.header("Add Department")
         new_department = st.text_input("Enter New Department Name")
 
         if st.button("Add Department", key="add_department"):
             if new_department:
-                connection = get_db_connection()
-                try:
+                with span("mysql.add_department", kind="db"), db_connection() as connection:
                     with connection.cursor() as cursor:
                         sql = "INSERT INTO departments (name) VALUES (%s)"
                         cursor.execute(sql, (new_department,))
                     connection.commit()
-                    st.success(f"Department '{new_department}' added successfully.")
-                finally:
-                    connection.close()
-        else:
+                departments_cache.invalidate("all")
+                st.success(f"Department '{new_department}' added successfully.")
+            else:
                 st.error("Please enter a department name.")
 
-def file_manager_page():
-    st.title("File Manager Page")
-
-    department_list = load_departments_from_db()
-    department = st.selectbox("Select Department", department_list)
-
-    container_client = blob_service_client.get_container_client(archive_container)
-    directories = load_directories(container_client, department)
+    elif option == "Bulk Import":
+        st.header("Bulk Import")
+        kind = st.radio("Import", ["Users", "Departments"], key="bulk_import_kind")
+        if kind == "Users":
+            st.write("Columns: email, password, role, name, roll_number (optional). "
+                     f"Roles: {', '.join(USER_ROLES)}.")
+        else:
+            st.write("Columns: name, directories (optional, separated by ';'). "
+                     "The listed directories are created under each new department.")
+        upload = st.file_uploader("CSV or Excel file", type=["csv", "xlsx"], key="bulk_import_file")
+
+        if upload is not None and st.button("Import", key="bulk_import"):
+            progress = st.empty()
+            show = lambda report: progress.write(  # noqa: E731
+                f"{report['rows']} row(s) read, {report['inserted']} added, "
+                f"{report['duplicates']} duplicate(s), {report['errors']} error(s)")
+            try:
+                if kind == "Users":
+                    report = import_users(upload, upload.name, progress=show)
+                else:
+                    report = import_departments(upload, upload.name, progress=show)
+            except bulk_import.ImportFormatError as exc:
+                st.error(str(exc))
+            else:
+                show(report)
+                st.success(f"Imported {report['inserted']} of {report['rows']} row(s).")
+                if report["directories"]:
+                    st.write(f"Created {len(report['directories'])} directory placeholder(s).")
+                if report["issues"]:
+                    st.warning(f"{len(report['issues'])} row(s) were skipped:")
+                    st.table(report["issues"])
+
+    elif option == "Export Rejection Log":
+        st.header("Export Rejection Log")
+        export_format = st.selectbox("Format", ["csv", "parquet"])
+        export_path = st.text_input("Export Path", value="exports/rejection_logs.csv" if export_format == "csv" else "exports/rejection_logs")
+
+        if st.button("Export", key="export_rejections"):
+            os.makedirs(os.path.dirname(export_path) or ".", exist_ok=True)
+            with db_connection() as connection:
+                exported = export_rejections(connection, export_path, fmt=export_format)
+            st.success(f"Exported {exported} new rejection(s) to {export_path}.")
+
+    elif option == "Reconcile File Manifest":
+        st.header("Reconcile File Manifest")
+        st.write("Rescans every container and brings the files table in line with Blob Storage. "
+                 "Run it after files are changed outside the portal.")
+
+        if st.button("Reconcile", key="reconcile_manifest"):
+            status = st.empty()
+            results = []
+            for container in CONTAINER_STATUS:
+                results.append(reconcile_manifest(
+                    container, progress=lambda stats: status.write(f"{stats['container']}: {stats['scanned']} blob(s) scanned")))
+            st.table(results)
+
+    elif option == "Diagnostics":
+        st.header("Diagnostics")
+
+        st.subheader("Query caches")
+        st.write("Each cache hit is a database round trip saved.")
+        st.table([{"cache": name, **stats} for name, stats in cache_snapshots().items()])
+
+        st.subheader("Connection pool")
+        st.table([get_db_pool().stats()])
+
+        st.subheader("Blob content cache")
+        st.table([get_content_cache().snapshot()])
+
+        st.subheader("Background jobs")
+        st.table([{key: job[key] for key in ("id", "kind", "status", "attempts", "done", "total", "error")}
+                  for job in get_job_queue().recent(20)])
+
+        st.subheader("Uploads")
+        st.write("Unchanged re-uploads are skipped; bytes_saved is what they would have sent.")
+        st.table([throughput_summary()])
+
+        st.subheader("Blob move latency (seconds)")
+        st.table([{"method": method, "count": stats["count"], "mean": stats["sum"] / stats["count"],
+                   **{f"<= {bucket}": count for bucket, count in stats["buckets"].items()}}
+                  for method, stats in move_latency.snapshot().items()])
+
+def performance_page():
+    st.title("Performance")
+    window_minutes = st.selectbox("Window", [5, 15, 60], index=2, format_func=lambda minutes: f"Last {minutes} min")
+
+    st.subheader("Slowest calls")
+    st.table([{"operation": span["name"], "kind": span["kind"], "ms": round(span["seconds"] * 1000, 1),
+               "bytes": span["bytes"], "error": span["error"] or ""}
+              for span in tracer.slowest(window=window_minutes * 60, limit=20)])
+
+    st.subheader("Totals since start")
+    st.table([{"operation": name, "kind": totals["kind"], "calls": totals["calls"], "errors": totals["errors"],
+               "mean ms": round(totals["seconds"] / totals["calls"] * 1000, 1),
+               "max ms": round(totals["max_seconds"] * 1000, 1), "bytes": totals["bytes"]}
+              for name, totals in sorted(tracer.snapshot().items(), key=lambda item: -item[1]["seconds"])])
+
+def file_label(blob_name):
+    roll_number, file_name = blob_name.split("/")[2:4]
+    return f"{roll_number} / {file_name}"
+
+def paged_file_picker(container_client, path_prefix, key):
+    # Lists one page of files at a time (by continuation token) and keeps the selection in
+    # session state across pages, so a rerun renders at most FILES_PER_PAGE rows however big the directory is.
+    roll_filter = st.text_input("Filter by roll number", key=f"{key}_filter").strip()
+    if key not in st.session_state:
+        st.session_state[key] = {"filter": None, "tokens": [None], "selected": {}}
+    pager = st.session_state[key]
+    if pager["filter"] != roll_filter:
+        pager["filter"] = roll_filter
+        pager["tokens"] = [None]
+    selected = pager["selected"]
+
+    rows, next_token = list_file_page(container_client, path_prefix, roll_filter, pager["tokens"][-1])
+    if not rows and len(pager["tokens"]) == 1:
+        st.write("No files found.")
+    else:
+        st.write(f"Page {len(pager['tokens'])}")
+        st.table([{"roll number": blob_name.split("/")[2], "file": os.path.basename(blob_name),
+                   "size (KB)": round((entry["size"] or 0) / 1024, 1), "last modified": entry["last_modified"],
+                   "selected": "✓" if blob_name in selected else ""}
+                  for blob_name, entry in rows.items()])
+        chosen = st.multiselect("Select files on this page", list(rows), format_func=file_label,
+                                default=[blob_name for blob_name in rows if blob_name in selected],
+                                key=f"{key}_page_{roll_filter}_{len(pager['tokens'])}")
+        for blob_name, entry in rows.items():
+            if blob_name in chosen:
+                selected[blob_name] = entry
+            else:
+                selected.pop(blob_name, None)
 
-    if not directories:
-        st.write("No directories found. Please contact admin to create directories.")
-        return
+    if len(pager["tokens"]) > 1 and st.button("Previous page", key=f"{key}_previous"):
+        pager["tokens"].pop()
+        st.experimental_rerun()
+    if next_token is not None and st.button("Next page", key=f"{key}_next"):
+        pager["tokens"].append(next_token)
+        st.experimental_rerun()
 
-    directory = st.selectbox("Select Directory", directories)
-    roll_numbers = list_roll_numbers(container_client, f"{department}/{directory}")
+    if st.button("Select all matching files", key=f"{key}_select_all"):
+        # One indexed query for every match rather than walking the pages. A button rather than a
+        # checkbox, so it applies once and later unticks (or "Clear selection") stick.
+        matching, _ = list_file_page(container_client, path_prefix, roll_filter, None, page_size=None)
+        selected.update(matching)
+        st.experimental_rerun()
 
-    if roll_numbers:
-        roll_number = st.selectbox("Select Roll Number", roll_numbers)
-    else:
-        st.write("No roll numbers found.")
-        return
+    if selected:
+        st.write(f"{len(selected)} file(s) selected in total")
+        if st.button("Clear selection", key=f"{key}_clear"):
+            selected.clear()
+            st.experimental_rerun()
+    return dict(selected)
 
-    blob_prefix = f"{department}/{directory}/{roll_number}/"
-    blobs = list_files(container_client, blob_prefix)
-
-    if blobs:
-        selected_files = st.multiselect("Select Files to Move", blobs)
-
-        if selected_files:
-            action = st.radio("Action", ["Move to Archive", "Reject File"])
-
-            if action == "Reject File":
-                rejection_reason = st.text_input("Reason for Rejection")
-
-            if st.button("Execute"):
-                for blob_name in selected_files:
-                    file_name = os.path.basename(blob_name)
-                    if action == "Move to Archive":
-                        display_timer(3)  # Display a 3-second timer
-                        move_blob(blob_service_client.get_container_client(container_name),
-                                  blob_service_client.get_container_client(archive_container),
-                                  blob_name, f"{department}/{directory}/{roll_number}/{file_name}")
-                        st.success(f"File {file_name} moved to archive successfully.")
-                    elif action == "Reject File":
-                        if rejection_reason:
-                            display_timer(3)  # Display a 3-second timer
-                            move_blob(blob_service_client.get_container_client(container_name),
-                                      blob_service_client.get_container_client(reject_container),
-                                      blob_name, f"{department}/{directory}/{roll_number}/{file_name}")
-                            log_rejection(roll_number, file_name, rejection_reason)
-                            st.success(f"File {file_name} rejected successfully.")
-                        else:
-                            st.warning("Please provide a reason for rejection.")
-    else:
-        st.write("No files found.")
+def forget_moved(key, status):
+    selected = st.session_state[key]["selected"]
+    for job in status["jobs"]:
+        for blob_name in (job["result"] or {}).get("moved", []):
+            selected.pop(blob_name, None)
 
 def view_and_download_files_page():
     st.title("View and Download Files Page")
@@ -324,7 +819,7 @@ def view_and_download_files_page():
     department = st.selectbox("Select Department", department_list)
 
     # Step 2: Load Directories based on selected Department
-    container_client = blob_service_client.get_container_client(archive_container)
+    container_client = get_blob_service_client().get_container_client(archive_container)
     directories = load_directories(container_client, department)
 
     if not directories:
@@ -334,59 +829,98 @@ def view_and_download_files_page():
     # Step 3: Select Directory
     directory = st.selectbox("Select Directory", directories)
 
-    # Step 4: Load Roll Numbers based on selected Directory
-    roll_numbers = list_roll_numbers(container_client, f"{department}/{directory}")
-
-    if not roll_numbers:
-        st.write("No roll numbers found.")
-        return
-
-    # Step 5: Select Roll Numbers
-    selected_roll_numbers = st.multiselect("Select Roll Number(s)", roll_numbers)
-
-    all_files = []
-    roll_number_file_map = {}
-
-    if selected_roll_numbers:
-        for roll_number in selected_roll_numbers:
-            blob_prefix = f"{department}/{directory}/{roll_number}/"
-            file_list = list_files(container_client, blob_prefix)
-            if file_list:
-                file_names = [os.path.basename(file) for file in file_list]
-                roll_number_file_map[roll_number] = file_names
-                all_files.extend(file_list)
-
-    if all_files:
-        st.write("Files for selected roll number(s):")
-
-        # Add a checkbox for "Select All"
-        select_all = st.checkbox("Select All", key="select_all")
-        
-        files_to_download = []
-        individual_checks = {}
-
-        if select_all:
-            for file_path in all_files:
-                file_name = os.path.basename(file_path)
-                individual_checks[file_path] = True
-                file_stream = download_blob_as_bytes(container_client, file_path)
-                files_to_download.append((file_name, file_stream))
+    # Step 4: Pick files a page at a time. The selection is kept as metadata (name, size,
+    # etag); blob contents are only fetched when the user asks for the archive.
+    selected = paged_file_picker(container_client, f"{department}/{directory}", key=f"download_{department}_{directory}")
+
+    if selected:
+        total_size = sum(entry.get("size") or 0 for entry in selected.values())
+        key = selection_key(selected)
+
+        # Warm the local content cache in the background while the user keeps picking, once per
+        # change of selection (not on every rerun, e.g. while a zip job is watched). A selection
+        # larger than the cache would only evict its own files, so it isn't prefetched.
+        content_cache = get_content_cache()
+        prefetch_key = key or sorted(selected)
+        if total_size <= content_cache.max_bytes and st.session_state.get("prefetched_selection") != prefetch_key:
+            content_cache.prefetch(container_client, selected)
+            st.session_state["prefetched_selection"] = prefetch_key
+
+        # Step 5: Provide Download Options
+        st.write(f"Selection size: {total_size / (1024 * 1024):.1f} MB")
+
+        zip_cache = get_zip_cache()
+        zip_path = None
+        zip_job = st.session_state.get("zip_job")
+        if zip_job is not None and zip_job[0] != sorted(selected):
+            zip_job = None
+        if not zip_cache.contains(key) and zip_job is not None:
+            status = watch_jobs(zip_job[1], "Preparing zip")
+            result = status["jobs"][0]["result"]
+            if status["failed"]:
+                st.error(f"The zip could not be prepared: {status['jobs'][0]['error']}")
+            elif key is None and os.path.exists(result["path"]):
+                # Selections without etags aren't cached; the job's archive is this session's alone.
+                zip_path = result["path"]
+            del st.session_state["zip_job"]
+        # A cached archive is read through the zip cache, which keeps it on disk while it streams.
+        with zip_cache.open(key) as cached_zip:
+            if cached_zip is not None:
+                st.download_button(label="Download Selected as Zip", data=cached_zip, file_name="selected_files.zip")
+            elif zip_path is None and st.button("Prepare Zip"):
+                st.session_state["zip_job"] = (sorted(selected), submit_zip(archive_container, selected))
+                st.experimental_rerun()
+        if zip_path is not None:
+            with open(zip_path, "rb") as zip_file:
+                st.download_button(label="Download Selected as Zip", data=zip_file, file_name="selected_files.zip")
+            os.remove(zip_path)
+
+    export_section(department, directory)
+
+def export_section(department, directory):
+    # Exports the whole directory without selecting files: one zip per roll number or one
+    # combined zip, built by a background job that resumes where it stopped if interrupted.
+    st.subheader("Export Whole Directory")
+    layout = st.radio("Archives", [exports.PER_ROLL, exports.COMBINED], key="export_layout",
+                      format_func=lambda layout: "One zip per roll number" if layout == exports.PER_ROLL
+                      else "One combined zip")
+    destination = st.radio("Save to", ["spool", "blob"], key="export_destination",
+                           format_func=lambda destination: "Export folder on the server" if destination == "spool"
+                           else f"'{EXPORT_CONTAINER}' storage container")
+    export_key = f"export_{department}_{directory}"
+    if export_key in st.session_state:
+        group_id, started_at = st.session_state[export_key]
+        status = get_job_queue().group(group_id)
+        if not status["finished"] and status["done"]:
+            st.write(f"{status['done'] / max(time.time() - started_at, 1e-6):.1f} files/s")
+        status = watch_jobs(group_id, f"Exporting {department}/{directory}")
+        job = status["jobs"][0]
+        if status["failed"]:
+            st.error(f"The export stopped: {job['error']}")
+            if st.button("Resume export"):
+                get_job_queue().retry(group_id)
+                st.experimental_rerun()
+            return
+        result = job["result"]
+        st.success(f"Exported {result['files']} file(s) into {len(result['archives'])} archive(s) "
+                   f"at {result['bytes'] / (1024 * 1024) / max(result['seconds'], 1e-6):.1f} MB/s.")
+        if not result["archives"]:
+            st.write("There were no files to export.")
+        elif result.get("blobs"):
+            st.write(f"Saved to the '{EXPORT_CONTAINER}' container under {os.path.dirname(result['blobs'][0])}/.")
+        elif len(result["archives"]) == 1 and os.path.exists(result["archives"][0]):
+            with open(result["archives"][0], "rb") as zip_file:
+                st.download_button(label="Download Export", data=zip_file,
+                                   file_name=os.path.basename(result["archives"][0]))
         else:
-            for file_path in all_files:
-                file_name = os.path.basename(file_path)
-                individual_checks[file_path] = st.checkbox(f"Select {file_name}", key=file_path)
-                if individual_checks[file_path]:
-                    file_stream = download_blob_as_bytes(container_client, file_path)
-                    files_to_download.append((file_name, file_stream))
-        
-        # Check if any individual checkbox is unchecked, then uncheck the "Select All" checkbox
-        if all(individual_checks.values()) and not select_all:
-            st.experimental_rerun()
-
-        # Step 8: Provide Download Options
-        if files_to_download:
-            zip_buffer = create_zip(files_to_download)
-            st.download_button(label="Download Selected as Zip", data=zip_buffer, file_name="selected_files.zip")
+            st.write(f"Saved to {os.path.dirname(result['archives'][0])} on the server.")
+        if not st.button("Done", key=f"{export_key}_done"):
+            return
+        del st.session_state[export_key]
+    if st.button("Export", key=f"{export_key}_start"):
+        st.session_state[export_key] = (submit_export(archive_container, department, directory, layout, destination),
+                                        time.time())
+        st.experimental_rerun()
 
 def uploader_page():
     # Check for rejected files
@@ -406,32 +940,34 @@ def uploader_page():
     department_list = load_departments_from_db()
     department = st.selectbox("Select Department", department_list, index=0)
 
-    container_client = blob_service_client.get_container_client(container_name)
+    container_client = get_blob_service_client().get_container_client(container_name)
     directories = load_directories(container_client, department)
 
-    if directories:
-        directory = st.selectbox("Select Directory", directories)
-    else:
+    if not directories:
         st.write("No directories found. Please contact admin to create directories.")
+        return
 
+    directory = st.selectbox("Select Directory", directories)
     file = st.file_uploader("Upload File",type={"pdf"})
     
     if st.button("Upload"):
         if department and directory and roll_number and file:
             blob_name = f"{department}/{directory}/{roll_number}/{file.name}"
-            upload_file(container_client, file, blob_name)
-
-            # Update the rejection log to set resolved flag to 1
-            connection = get_db_connection()
+            progress_bar = st.progress(0.0)
             try:
-                with connection.cursor() as cursor:
-                    sql = "UPDATE rejection_logs SET resolved = 1 WHERE directory = %s AND roll_number = %s"
-                    cursor.execute(sql, (directory, roll_number))
-                connection.commit()
-            finally:
-                connection.close()
-
-            st.success("File uploaded successfully!")
+                result = upload_file(container_client, file, blob_name,
+                                     progress=lambda done, total: progress_bar.progress(done / total))
+            except Exception as exc:
+                st.error(f"Upload interrupted ({exc}). Click Upload again to resume from where it stopped.")
+                return
+            progress_bar.progress(1.0)
+
+            if result.deduplicated:
+                st.success(f"This file is already uploaded and unchanged; nothing was sent "
+                           f"({result.size / (1024 * 1024):.1f} MB saved).")
+            else:
+                st.success(f"File uploaded successfully! ({result.size / (1024 * 1024):.1f} MB at "
+                           f"{result.throughput / (1024 * 1024):.1f} MB/s)")
         else:
             st.error("Please fill in all fields before uploading.")
 
@@ -440,7 +976,7 @@ def file_manager_page():
     department_list = load_departments_from_db()
     department = st.selectbox("Select Department", department_list)
 
-    container_client = blob_service_client.get_container_client(container_name)
+    container_client = get_blob_service_client().get_container_client(container_name)
     directories = load_directories(container_client, department)
 
     if not directories:
@@ -448,72 +984,67 @@ def file_manager_page():
         return
 
     directory = st.selectbox("Select Directory", directories)
-    roll_numbers = list_roll_numbers(container_client, f"{department}/{directory}")
-
-    if roll_numbers:
-        selected_roll_numbers = st.multiselect("Select Roll Number(s)", roll_numbers)
-    else:
-        st.write("No roll numbers found in this directory.")
-        return
+    pager_key = f"manage_{department}_{directory}"
+    selected = paged_file_picker(container_client, f"{department}/{directory}", key=pager_key)
+
+    job_key = f"{pager_key}_job"
+    if job_key in st.session_state:
+        group_id, verb = st.session_state[job_key]
+        status = watch_jobs(group_id, verb.capitalize())
+        forget_moved(pager_key, status)
+        moved = sum(len((job["result"] or {}).get("moved", [])) for job in status["jobs"])
+        bytes_saved = sum((job["result"] or {}).get("bytes_saved", 0) for job in status["jobs"])
+        if status["failed"]:
+            failed = []
+            for job in status["jobs"]:
+                if job["status"] == FAILED and (job["result"] or {}).get("failed"):
+                    failed.extend(job["result"]["failed"])
+                elif job["error"]:
+                    st.error(job["error"])
+            if failed:
+                st.error(f"{len(failed)} file(s) could not be {verb}:")
+                st.table([{"roll number": manifest.split_blob_name(entry["blob_name"])[2],
+                           "file": os.path.basename(entry["blob_name"]), "error": entry["error"]}
+                          for entry in failed])
+            if st.button("Retry failed files"):
+                get_job_queue().retry(group_id)
+                st.experimental_rerun()
+            if not st.button("Dismiss"):
+                return
+        else:
+            st.success(f"{moved} of {status['total']} selected file(s) {verb} successfully.")
+            if bytes_saved:
+                st.info(f"{bytes_saved / (1024 * 1024):.1f} MB already held at the destination was not copied again.")
+        del st.session_state[job_key]
 
-    all_files = []
-    roll_number_file_map = {}
-
-    if selected_roll_numbers:
-        st.write(f"Files for selected roll number(s):")
-        for roll_number in selected_roll_numbers:
-            path_prefix = f"{department}/{directory}/{roll_number}"
-            files = list_files(container_client, path_prefix)
-            if files:
-                file_names = [os.path.basename(file) for file in files]
-                roll_number_file_map[roll_number] = file_names
-                all_files.extend(file_names)
-
-    if all_files:
-        selected_files = st.multiselect("Select Files to Archive/Reject", all_files)
+    if selected:
         action = st.selectbox("Select Action", ["Archive", "Reject"])
 
         if action == "Reject":
             rejection_reason = st.text_area("Enter reason for rejection")
             if st.button("Submit"):
                 if rejection_reason:
-                    for selected_file in selected_files:
-                        for roll_number in selected_roll_numbers:
-                            if selected_file in roll_number_file_map[roll_number]:
-                                source_blob_name = f"{department}/{directory}/{roll_number}/{selected_file}"
-                                new_blob_name = source_blob_name.replace(container_name, reject_container)
-                                try:
-                                    source_client = blob_service_client.get_container_client(container_name)
-                                    dest_client = blob_service_client.get_container_client(reject_container)
-                                    move_blob(source_client, dest_client, source_blob_name, new_blob_name)
-                                    log_rejection(department, directory, roll_number, selected_file, rejection_reason)
-                                except ResourceNotFoundError:
-                                    st.error(f"File {selected_file} not found in the source path.")
-                    st.success("Selected files rejected and moved successfully.")
+                    group_id = submit_moves(container_name, reject_container, selected, reason=rejection_reason)
+                    st.session_state[job_key] = (group_id, "rejected")
+                    st.experimental_rerun()
                 else:
                     st.error("Please provide a reason for rejection.")
         elif action == "Archive":
             if st.button("Archive"):
-                for selected_file in selected_files:
-                    for roll_number in selected_roll_numbers:
-                        if selected_file in roll_number_file_map[roll_number]:
-                            source_blob_name = f"{department}/{directory}/{roll_number}/{selected_file}"
-                            new_blob_name = source_blob_name.replace(container_name, archive_container)
-                            try:
-                                source_client = blob_service_client.get_container_client(container_name)
-                                dest_client = blob_service_client.get_container_client(archive_container)
-                                move_blob(source_client, dest_client, source_blob_name, new_blob_name)
-                            except ResourceNotFoundError:
-                                st.error(f"File {selected_file} not found in the source path.")
-                st.success("Selected files archived successfully.")
+                group_id = submit_moves(container_name, archive_container, selected)
+                st.session_state[job_key] = (group_id, "archived")
+                st.experimental_rerun()
 
 def main():
+    backends.get("trace_exporters", start_trace_exporters)
     page = []
     # Determine authenticated user role
-    user_role = st.session_state.user_role
     if "user_role" not in st.session_state:
         st.session_state.user_role = None
+    user_role = st.session_state.user_role
 
+    if st.session_state.user_role is None and restore_session():
+        st.experimental_rerun()
     if st.session_state.user_role is None:
         if login_page():
             st.experimental_rerun()
@@ -538,21 +1069,31 @@ def main():
         page = st.sidebar.selectbox("Go to", ["📤 Upload Files", "📁 Manage Files", "📥 View and Download Files"])
     elif user_role == USER_ROLE_ADMIN:
         # Display all pages plus admin page
-        page = st.sidebar.selectbox("Go to", ["⚙️ Admin"])
+        pages = ["⚙️ Admin"]
+        if "perf" in st.experimental_get_query_params():
+            pages.append("⏱️ Performance")
+        page = st.sidebar.selectbox("Go to", pages)
 
     # Render selected page based on user's role and selected option
-    if page == "📤 Upload Files":
-        uploader_page()
-    elif page == "📁 Manage Files":
-        file_manager_page()
-    elif page == "📥 View and Download Files":
-        view_and_download_files_page()
-    elif page == "⚙️ Admin":
-        admin_page()
+    with span(f"page:{page}" if page else "page:login"):
+        if page == "📤 Upload Files":
+            uploader_page()
+        elif page == "📁 Manage Files":
+            file_manager_page()
+        elif page == "📥 View and Download Files":
+            view_and_download_files_page()
+        elif page == "⚙️ Admin":
+            admin_page()
+        elif page == "⏱️ Performance":
+            performance_page()
 
     # Logout button
     if st.sidebar.button("Logout"):
+        # Revokes the URL token everywhere it was copied, along with the user's other sessions.
+        if st.session_state.get("user_email"):
+            end_session(st.session_state.user_email)
         st.session_state.clear()  # Clear all session state variables
+        set_session_token(None)
         st.experimental_rerun()
 
 if __name__ == "__main__":
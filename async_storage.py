@@ -0,0 +1,186 @@
+import asyncio
+import queue
+import threading
+import time
+from io import BytesIO
+
+from blob_moves import COPY_TIMEOUT, POLL_INITIAL, POLL_MAX, MoveError, MoveResult, move_latency
+from tracing import traced
+
+# Upper bound on storage requests in flight at once for one fan_out() call.
+MAX_CONCURRENCY = 64
+
+# All async clients live on one long-running event loop in a daemon thread, so their HTTP
+# sessions (and connection pools) are shared by every session and survive Streamlit reruns.
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="async-storage", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def run(coroutine, timeout=None):
+    # Runs one coroutine on the shared loop and blocks the calling (script) thread for its result.
+    return asyncio.run_coroutine_threadsafe(coroutine, event_loop()).result(timeout)
+
+
+def fan_out(calls, limit=MAX_CONCURRENCY, progress=None):
+    # calls are zero-argument callables returning coroutines. Results come back in order, with
+    # exceptions returned in place of results. progress(done, total, outcome) is called on the
+    # calling thread, so it may safely update Streamlit elements.
+    calls = list(calls)
+    total = len(calls)
+    finished = queue.Queue()
+
+    async def guarded(semaphore, call):
+        async with semaphore:
+            try:
+                outcome = await call()
+            except Exception as exc:
+                outcome = exc
+        finished.put(outcome)
+        return outcome
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(limit)
+        return await asyncio.gather(*(guarded(semaphore, call) for call in calls))
+
+    future = asyncio.run_coroutine_threadsafe(run_all(), event_loop())
+    done = 0
+    while done < total:
+        try:
+            outcome = finished.get(timeout=0.1)
+        except queue.Empty:
+            if future.done():
+                break
+            continue
+        done += 1
+        if progress is not None:
+            progress(done, total, outcome)
+    return future.result()
+
+
+@traced("blob.async.list_files", kind="storage")
+async def list_files(container_client, prefix):
+    return [blob.name async for blob in container_client.list_blobs(name_starts_with=prefix)]
+
+
+@traced("blob.async.list_roll_numbers", kind="storage")
+async def list_roll_numbers(container_client, path_prefix):
+    prefix = path_prefix.strip("/") + "/"
+    roll_numbers = set()
+    async for blob in container_client.list_blobs(name_starts_with=prefix):
+        parts = blob.name[len(prefix):].split("/")
+        if len(parts) > 1 and parts[0]:
+            roll_numbers.add(parts[0])
+    return sorted(roll_numbers)
+
+
+@traced("blob.async.download", kind="storage", measure=lambda stream: stream.getbuffer().nbytes)
+async def download_blob_as_bytes(container_client, blob_name):
+    stream = BytesIO()
+    downloader = await container_client.get_blob_client(blob_name).download_blob()
+    await downloader.readinto(stream)
+    stream.seek(0)
+    return stream
+
+
+@traced("blob.async.upload", kind="storage", measure=lambda response: response["size"])
+async def upload_file(container_client, data, blob_name):
+    response = await container_client.get_blob_client(blob_name).upload_blob(data, overwrite=True)
+    return dict(response, size=len(data))
+
+
+async def _abort_copy(dest_blob, result):
+    try:
+        if result.copy_id:
+            await dest_blob.abort_copy(result.copy_id)
+        # An aborted copy leaves an empty destination blob behind.
+        await dest_blob.delete_blob()
+    except Exception:
+        pass
+
+
+async def _move(source_client, dest_client, result, timeout, duplicate=None):
+    source_blob = source_client.get_blob_client(result.blob_name)
+    dest_blob = dest_client.get_blob_client(result.new_blob_name)
+    if duplicate is not None:
+        # The destination already holds this content; only the source goes.
+        result.method = "deduplicated"
+        result.size = duplicate.get("size")
+        result.etag = duplicate.get("etag")
+        result.last_modified = duplicate.get("last_modified")
+        try:
+            await source_blob.delete_blob()
+        except Exception as exc:
+            result.error = str(exc)
+            return result
+        result.ok = True
+        move_latency.observe(result.method, time.monotonic() - result.started_at)
+        return result
+    try:
+        copy = await dest_blob.start_copy_from_url(source_blob.url)
+        status = copy.get("copy_status")
+        result.copy_id = copy.get("copy_id")
+        result.method = "sync_copy"
+        result.etag = copy.get("etag")
+        result.last_modified = copy.get("last_modified")
+
+        # Only this blob waits while its copy runs; the other moves keep going on the loop.
+        delay = POLL_INITIAL
+        deadline = time.monotonic() + timeout
+        while status == "pending":
+            if time.monotonic() + delay > deadline:
+                await _abort_copy(dest_blob, result)
+                result.error = f"copy did not finish within {timeout}s"
+                return result
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, POLL_MAX)
+            props = await dest_blob.get_blob_properties()
+            status = props.copy.status
+            result.method = "async_copy"
+            result.size = props.size
+            result.etag = props.etag
+            result.last_modified = props.last_modified
+        if status != "success":
+            result.error = f"copy {status}"
+            return result
+
+        await source_blob.delete_blob()
+    except Exception as exc:
+        result.error = str(exc)
+        return result
+
+    result.ok = True
+    move_latency.observe(result.method, time.monotonic() - result.started_at)
+    return result
+
+
+@traced("blob.async.move", kind="storage")
+async def move_blob(source_client, dest_client, blob_name, new_blob_name, timeout=COPY_TIMEOUT):
+    result = await _move(source_client, dest_client, MoveResult(blob_name, new_blob_name), timeout)
+    if not result.ok:
+        raise MoveError(f"Moving {blob_name} failed: {result.error}")
+    return result
+
+
+def download_many(container_client, blob_names, limit=MAX_CONCURRENCY, progress=None):
+    return fan_out([lambda blob_name=blob_name: download_blob_as_bytes(container_client, blob_name)
+                    for blob_name in blob_names], limit=limit, progress=progress)
+
+
+def move_many(source_client, dest_client, moves, limit=MAX_CONCURRENCY, timeout=COPY_TIMEOUT, progress=None,
+              duplicates=None):
+    # Same contract as blob_moves.move_blobs: one MoveResult per move, failures recorded on it.
+    results = [MoveResult(blob_name, new_blob_name) for blob_name, new_blob_name in moves]
+    duplicates = duplicates or {}
+    fan_out([lambda result=result: _move(source_client, dest_client, result, timeout, duplicates.get(result.blob_name))
+             for result in results], limit=limit, progress=progress)
+    return results
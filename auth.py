@@ -0,0 +1,81 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+
+ALGORITHM = "pbkdf2_sha256"
+# PBKDF2 iterations for new hashes. Raising it slows every login (and every guess) proportionally;
+# existing hashes keep their own cost and are upgraded on the user's next successful login.
+KDF_ITERATIONS = 200_000
+SALT_BYTES = 16
+# Session tokens travel in URLs (history, Referer headers, copied links), so they expire quickly.
+TOKEN_TTL = 2 * 3600
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+# Verified against when the account doesn't exist, so that costs the same KDF work as a wrong password.
+DUMMY_HASH = f"{ALGORITHM}${KDF_ITERATIONS}${_b64encode(bytes(SALT_BYTES))}${_b64encode(bytes(32))}"
+
+
+def hash_password(password, iterations=None):
+    iterations = iterations or KDF_ITERATIONS
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"{ALGORITHM}${iterations}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def is_hashed(stored):
+    return stored.startswith(f"{ALGORITHM}$")
+
+
+def verify_password(password, stored, iterations=None):
+    # Returns (matches, needs_rehash). Rows created before hashing was introduced hold the
+    # plaintext password; they still verify, and are flagged so the caller can upgrade them.
+    if not stored:
+        return False, False
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode(), stored.encode()), True
+    try:
+        _, rounds, salt, expected = stored.split("$")
+        rounds = int(rounds)
+        salt, expected = _b64decode(salt), _b64decode(expected)
+    except ValueError:
+        return False, False
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, rounds)
+    return hmac.compare_digest(digest, expected), rounds != (iterations or KDF_ITERATIONS)
+
+
+def issue_token(secret, claims, ttl=TOKEN_TTL):
+    # A signed, self-contained session token: base64(claims).base64(HMAC-SHA256). Checking the
+    # signature and expiry needs only the secret; whether the claims are still current (e.g. not
+    # revoked) is for the caller to check.
+    body = _b64encode(json.dumps(dict(claims, exp=int(time.time() + ttl)), sort_keys=True).encode())
+    return f"{body}.{_sign(secret, body)}"
+
+
+def validate_token(secret, token):
+    # Returns the claims, or None if the token is malformed, forged or expired.
+    try:
+        body, signature = token.split(".")
+        if not hmac.compare_digest(signature, _sign(secret, body)):
+            return None
+        claims = json.loads(_b64decode(body))
+    except (ValueError, AttributeError):
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return claims
+
+
+def _sign(secret, body):
+    return _b64encode(hmac.new(secret.encode(), body.encode(), hashlib.sha256).digest())
+
@@ -0,0 +1,30 @@
+import threading
+
+# Process-wide service objects (blob service client, DB connect function, DB pool), created on
+# first use and reused across Streamlit reruns. Benchmarks and tests install in-process fakes
+# with override() before any page runs.
+_instances = {}
+_overrides = {}
+_lock = threading.RLock()
+
+
+def get(name, factory):
+    with _lock:
+        if name in _overrides:
+            return _overrides[name]
+        if name not in _instances:
+            _instances[name] = factory()
+        return _instances[name]
+
+
+def override(**backends):
+    with _lock:
+        _overrides.update(backends)
+        # Anything built on top of the replaced backends (e.g. a pool of real connections) is rebuilt.
+        _instances.clear()
+
+
+def reset():
+    with _lock:
+        _overrides.clear()
+        _instances.clear()
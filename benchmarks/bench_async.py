@@ -0,0 +1,111 @@
+# Listing, downloading, uploading and moving 1,000 blobs: sequential sync calls (how the pages
+# used to work) vs. the sync client on a thread pool vs. the async client fanned out on one
+# event loop, against the in-memory blob stand-in.
+#
+#   python benchmarks/bench_async.py --blobs 1000 --latency-ms 10 --concurrency 64
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import async_storage  # noqa: E402
+from blob_moves import MAX_WORKERS, move_blob, move_blobs  # noqa: E402
+from fake_blob import FakeAsyncContainerClient, FakeBlobStore, FakeContainerClient  # noqa: E402
+
+SOURCE = "placements-2024"
+ARCHIVE = "archive"
+
+
+def seed(store, blobs, size):
+    store.containers.clear()
+    for i in range(blobs):
+        store.put(SOURCE, f"CSE/2024/R{i // 5:04d}/doc{i % 5}.pdf", data=os.urandom(size))
+
+
+def blob_names(store):
+    return sorted(store.container(SOURCE))
+
+
+def download(container_client, blob_name):
+    stream = BytesIO()
+    container_client.get_blob_client(blob_name).download_blob().readinto(stream)
+    return stream
+
+
+def sequential(func, items):
+    return [func(item) for item in items]
+
+
+def threaded(func, items):
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        return list(executor.map(func, items))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--blobs", type=int, default=1000)
+    parser.add_argument("--size-kb", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=async_storage.MAX_CONCURRENCY)
+    args = parser.parse_args()
+
+    store = FakeBlobStore(latency=args.latency_ms / 1000)
+    size = args.size_kb * 1024
+    sync_source, sync_archive = FakeContainerClient(store, SOURCE), FakeContainerClient(store, ARCHIVE)
+    async_source, async_archive = FakeAsyncContainerClient(store, SOURCE), FakeAsyncContainerClient(store, ARCHIVE)
+    print(f"{args.blobs} blobs of {args.size_kb} KiB, {args.latency_ms} ms per call, "
+          f"{MAX_WORKERS} threads vs. {args.concurrency} async requests in flight")
+    print(f"{'workload':<10} {'sync sequential':>16} {'sync threads':>13} {'async':>8}")
+
+    def measure(prepare, runs):
+        timings = []
+        for run in runs:
+            prepare()
+            store.calls.clear()
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    def report(workload, timings):
+        print(f"{workload:<10} " + " ".join(f"{timing:>{width}.2f}s" for timing, width in zip(timings, (15, 12, 7))))
+
+    seed(store, args.blobs, size)
+    roll_prefixes = sorted({name.rsplit("/", 1)[0] for name in blob_names(store)})
+    list_one = lambda prefix: [blob.name for blob in sync_source.list_blobs(name_starts_with=prefix)]  # noqa: E731
+    report("list", measure(lambda: None, [
+        lambda: sequential(list_one, roll_prefixes),
+        lambda: threaded(list_one, roll_prefixes),
+        lambda: async_storage.fan_out([lambda prefix=prefix: async_storage.list_files(async_source, prefix)
+                                       for prefix in roll_prefixes], limit=args.concurrency),
+    ]))
+
+    names = blob_names(store)
+    report("download", measure(lambda: None, [
+        lambda: sequential(lambda name: download(sync_source, name), names),
+        lambda: threaded(lambda name: download(sync_source, name), names),
+        lambda: async_storage.download_many(async_source, names, limit=args.concurrency),
+    ]))
+
+    payload = os.urandom(size)
+    report("upload", measure(lambda: None, [
+        lambda: sequential(lambda name: sync_archive.get_blob_client(name).upload_blob(payload, overwrite=True), names),
+        lambda: threaded(lambda name: sync_archive.get_blob_client(name).upload_blob(payload, overwrite=True), names),
+        lambda: async_storage.fan_out([lambda name=name: async_storage.upload_file(async_archive, payload, name)
+                                       for name in names], limit=args.concurrency),
+    ]))
+
+    moves = [(name, name) for name in names]
+    report("move", measure(lambda: seed(store, args.blobs, size), [
+        lambda: sequential(lambda move: move_blob(sync_source, sync_archive, *move), moves),
+        lambda: move_blobs(sync_source, sync_archive, moves),
+        lambda: async_storage.move_many(async_source, async_archive, moves, limit=args.concurrency),
+    ]))
+
+
+if __name__ == "__main__":
+    main()
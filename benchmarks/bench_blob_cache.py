@@ -0,0 +1,78 @@
+# Several recruiters pulling the same archived shortlist: direct downloads vs. the
+# local content cache (with and without prefetch), against an in-memory blob stand-in.
+#
+#   python benchmarks/bench_blob_cache.py --users 5 --files 50 --latency-ms 20
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from blob_cache import BlobContentCache  # noqa: E402
+from fake_blob import FakeBlobStore, FakeContainerClient  # noqa: E402
+
+
+def direct_download(container_client, blob_name, entry):
+    stream = BytesIO()
+    container_client.get_blob_client(blob_name).download_blob().readinto(stream)
+    return stream
+
+
+def run(label, store, users, download):
+    store.calls.clear()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        list(executor.map(lambda user: download(), range(users)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<18} elapsed={elapsed:6.2f}s  blob downloads={store.calls['download_blob']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    store = FakeBlobStore(latency=args.latency_ms / 1000)
+    for i in range(args.files):
+        store.put("archive", f"CSE/2024/R{i:04d}/offer_letter.pdf", size=args.size_kb * 1024)
+    container_client = FakeContainerClient(store, "archive")
+    entries = {blob.name: {"etag": blob.etag} for blob in container_client.list_blobs()}
+    print(f"{args.users} users x {args.files} files of {args.size_kb} KiB, {args.latency_ms} ms per call")
+
+    def pull_all(fetch):
+        def pull():
+            for blob_name, entry in entries.items():
+                fetch(container_client, blob_name, entry)
+        return pull
+
+    run("direct", store, args.users, pull_all(direct_download))
+
+    def cached_fetch(cache):
+        def fetch(container_client, blob_name, entry):
+            with cache.open_blob(container_client, blob_name, etag=entry["etag"]) as handle:
+                return BytesIO(handle.read())
+        return fetch
+
+    cache = BlobContentCache(directory=tempfile.mkdtemp())
+    run("cached", store, args.users, pull_all(cached_fetch(cache)))
+    print(f"  {cache.snapshot()}")
+
+    cache = BlobContentCache(directory=tempfile.mkdtemp())
+    store.calls.clear()
+    started = time.perf_counter()
+    wait(cache.prefetch(container_client, entries))
+    print(f"prefetch           elapsed={time.perf_counter() - started:6.2f}s  "
+          f"blob downloads={store.calls['download_blob']}")
+    run("cached+prefetched", store, args.users, pull_all(cached_fetch(cache)))
+    print(f"  {cache.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
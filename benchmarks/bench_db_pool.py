@@ -0,0 +1,119 @@
+# Handshakes per page render: one connection per helper call vs. the shared pool.
+#
+#   python benchmarks/bench_db_pool.py                  # SQLite stand-in
+#   BENCH_MYSQL_HOST=127.0.0.1 BENCH_MYSQL_PASSWORD=... python benchmarks/bench_db_pool.py
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from db_pool import ConnectionPool  # noqa: E402
+from sqlite_backend import SQLiteConnection, create_schema  # noqa: E402
+
+
+def make_connect(args):
+    if os.environ.get("BENCH_MYSQL_HOST"):
+        import pymysql
+
+        def connect():
+            return pymysql.connect(
+                host=os.environ["BENCH_MYSQL_HOST"],
+                user=os.environ.get("BENCH_MYSQL_USER", "root"),
+                password=os.environ.get("BENCH_MYSQL_PASSWORD", ""),
+                database=os.environ.get("BENCH_MYSQL_DATABASE", "user_credentials"),
+                charset="utf8mb4",
+                cursorclass=pymysql.cursors.DictCursor,
+            )
+        return connect, "mysql"
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    create_schema(path)
+
+    def connect():
+        return SQLiteConnection(path, handshake_latency=args.handshake_ms / 1000)
+    return connect, f"sqlite (+{args.handshake_ms}ms simulated handshake)"
+
+
+class Counter:
+    def __init__(self, connect):
+        self._connect = connect
+        self.handshakes = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.handshakes += 1
+        return self._connect()
+
+
+def render_uploader_page(db_connection, roll_number):
+    # Mirrors the queries uploader_page issues on each rerun.
+    with db_connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT file_name, reason FROM rejection_logs WHERE roll_number=%s AND resolved=0",
+                           (roll_number,))
+            cursor.fetchall()
+    with db_connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM departments")
+            cursor.fetchall()
+
+
+def run(label, db_connection, counter, users, renders):
+    def session(user):
+        for _ in range(renders):
+            render_uploader_page(db_connection, f"R{user:04d}")
+
+    threads = [threading.Thread(target=session, args=(user,)) for user in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    total = users * renders
+    print(f"{label:<10} renders={total:<6} handshakes={counter.handshakes:<6} "
+          f"handshakes/render={counter.handshakes / total:.2f} "
+          f"elapsed={elapsed:.2f}s renders/s={total / elapsed:.0f}")
+    return counter.handshakes / total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--renders", type=int, default=25)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--handshake-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    connect, backend = make_connect(args)
+    print(f"backend: {backend}, users={args.users}, renders/user={args.renders}")
+
+    direct = Counter(connect)
+
+    @contextmanager
+    def direct_connection():
+        connection = direct()
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    before = run("per-call", direct_connection, direct, args.users, args.renders)
+
+    pooled = Counter(connect)
+    pool = ConnectionPool(pooled, max_size=args.pool_size)
+    after = run("pooled", pool.connection, pooled, args.users, args.renders)
+    pool.close()
+
+    print(f"handshakes avoided per render: {before - after:.2f}")
+    print(f"pool stats: {pool.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Exporting a whole archive directory: one "Select All" zip built sequentially (build_zip)
+# vs. the export job's layouts (exports.py), per-roll zips built in parallel and one combined
+# zip fed by parallel downloads, with a per-call latency like a remote storage account.
+#
+#   python benchmarks/bench_export.py --rolls 200 --files-per-roll 5 --latency-ms 30
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import exports  # noqa: E402
+from fake_blob import FakeBlobStore, FakeContainerClient  # noqa: E402
+from zip_builder import build_zip  # noqa: E402
+
+
+def report(label, elapsed, files, size):
+    print(f"{label:<28} {elapsed:>7.2f}s {files / elapsed:>9.1f} {size / 2**20 / elapsed:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rolls", type=int, default=200)
+    parser.add_argument("--files-per-roll", type=int, default=5)
+    parser.add_argument("--file-kb", type=int, default=256)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--workers", type=int, default=exports.MAX_WORKERS)
+    args = parser.parse_args()
+
+    store = FakeBlobStore(latency=args.latency_ms / 1000)
+    entries = {}
+    for roll in range(args.rolls):
+        for index in range(args.files_per_roll):
+            blob_name = f"CSE/2024/R{roll:04d}/document_{index}.pdf"
+            store.put("archive", blob_name, size=args.file_kb * 1024)
+            entries[blob_name] = {"size": args.file_kb * 1024}
+    container_client = FakeContainerClient(store, "archive")
+    total_size = sum(entry["size"] for entry in entries.values())
+    print(f"{len(entries)} files in {args.rolls} rolls, {total_size / 2**20:.0f} MiB, "
+          f"{args.latency_ms} ms per blob call, {args.workers} workers")
+    print(f"{'path':<28} {'elapsed':>8} {'files/s':>9} {'MiB/s':>9}")
+
+    output_dir = tempfile.mkdtemp()
+    try:
+        started = time.perf_counter()
+        with open(os.path.join(output_dir, "sequential.zip"), "wb") as handle:
+            build_zip(container_client, sorted(entries), fileobj=handle, entries=entries)
+        report("sequential build_zip", time.perf_counter() - started, len(entries), total_size)
+
+        for layout in (exports.PER_ROLL, exports.COMBINED):
+            started = time.perf_counter()
+            exports.export_directory(container_client, entries, os.path.join(output_dir, layout), layout=layout,
+                                     max_workers=args.workers)
+            report(f"export, {layout}", time.perf_counter() - started, len(entries), total_size)
+    finally:
+        shutil.rmtree(output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Onboarding a batch of students: one add_user call per row (a connection and a commit each)
+# vs. the bulk import (chunked executemany transactions) from CSV and XLSX, then departments
+# with directory placeholders created one at a time vs. batched. Needs pandas and openpyxl.
+#
+#   python benchmarks/bench_import.py --users 2000 --kdf-iterations 20000 --blob-latency-ms 20
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+import headless  # noqa: E402
+
+headless.install()
+
+import app  # noqa: E402
+import auth  # noqa: E402
+import backends  # noqa: E402
+from fake_blob import FakeBlobServiceClient, FakeBlobStore  # noqa: E402
+from sqlite_backend import RoundTrips, SQLiteConnection, create_schema  # noqa: E402
+
+
+def user_rows(count, offset):
+    rows = [{"email": f"student{i}@college.edu", "password": f"pw-{i}", "role": app.USER_ROLE_ACCESSOR,
+             "name": f"Student {i}", "roll_number": f"CSE{i:05d}"} for i in range(offset, offset + count)]
+    # A few rows every real sheet has: a repeat, the same email in other case, a bad email and a
+    # missing password.
+    rows += [dict(rows[0]), dict(rows[1], email=rows[1]["email"].upper()), dict(rows[1], email="not-an-email"),
+             dict(rows[2], email="new@college.edu", password="")]
+    return rows
+
+
+def as_csv(rows):
+    handle = io.StringIO()
+    writer = csv.DictWriter(handle, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return io.BytesIO(handle.getvalue().encode())
+
+
+def as_xlsx(rows):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(rows[0]))
+    for row in rows:
+        sheet.append(list(row.values()))
+    handle = io.BytesIO()
+    workbook.save(handle)
+    handle.seek(0)
+    return handle
+
+
+def report(label, elapsed, rows, round_trips, extra=""):
+    print(f"{label:<34} {elapsed:>7.2f}s {rows / elapsed:>9.0f} {round_trips:>9} {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--departments", type=int, default=50)
+    parser.add_argument("--directories", type=int, default=4, help="directories per imported department")
+    parser.add_argument("--kdf-iterations", type=int, default=auth.KDF_ITERATIONS,
+                        help="PBKDF2 cost; lower it to run quickly on a small machine")
+    parser.add_argument("--blob-latency-ms", type=float, default=20.0)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    parser.add_argument("--db-handshake-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    auth.KDF_ITERATIONS = args.kdf_iterations
+    db_path = os.path.join(tempfile.mkdtemp(), "portal.sqlite3")
+    create_schema(db_path)
+    round_trips = RoundTrips()
+    store = FakeBlobStore(latency=args.blob_latency_ms / 1000)
+
+    def connect():
+        return SQLiteConnection(db_path, handshake_latency=args.db_handshake_ms / 1000,
+                                query_latency=args.db_latency_ms / 1000, round_trips=round_trips)
+
+    backends.override(blob_service_client=FakeBlobServiceClient(store), db_connect=connect)
+
+    print(f"{args.users} users, PBKDF2 x{args.kdf_iterations}, {args.db_latency_ms} ms per query, "
+          f"{args.db_handshake_ms} ms per connection, {args.blob_latency_ms} ms per blob call")
+    print(f"{'path':<34} {'elapsed':>8} {'rows/s':>9} {'DB trips':>9}")
+
+    rows = user_rows(args.users, 0)[:args.users]
+    before, started = round_trips.total, time.perf_counter()
+    for row in rows:
+        # The Add New User form, once per row, with a fresh connection and commit each time.
+        connection = connect()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("INSERT INTO users (email, password, role, name, roll_number) VALUES (%s, %s, %s, %s, %s)",
+                               (row["email"], auth.hash_password(row["password"]), row["role"], row["name"],
+                                row["roll_number"]))
+            connection.commit()
+        finally:
+            connection.close()
+    report("add_user per row", time.perf_counter() - started, len(rows), round_trips.total - before)
+
+    for label, encode, file_name, offset in (("bulk import, CSV", as_csv, "students.csv", 1_000_000),
+                                             ("bulk import, XLSX", as_xlsx, "students.xlsx", 2_000_000)):
+        rows = user_rows(args.users, offset)
+        upload = encode(rows)
+        before, started = round_trips.total, time.perf_counter()
+        result = app.import_users(upload, file_name)
+        report(label, time.perf_counter() - started, len(rows), round_trips.total - before,
+               f"({result['inserted']} added, {result['duplicates']} duplicate(s), {result['errors']} error(s))")
+
+    departments = [{"name": f"DEPT{i:03d}", "directories": ";".join(str(2024 + d) for d in range(args.directories))}
+                   for i in range(args.departments)]
+    container_client = app.get_blob_service_client().get_container_client(app.container_name)
+    store.containers.clear()
+    before, started = round_trips.total, time.perf_counter()
+    for department in departments:
+        for directory in department["directories"].split(";"):
+            app.create_directory_placeholder(container_client, f"{department['name']}-seq/{directory}")
+    placeholders = args.departments * args.directories
+    report("placeholders one at a time", time.perf_counter() - started, placeholders, round_trips.total - before)
+
+    before, started = round_trips.total, time.perf_counter()
+    result = app.import_departments(as_csv(departments), "departments.csv")
+    report("department import, batched", time.perf_counter() - started, placeholders, round_trips.total - before,
+           f"({result['inserted']} departments, {len(result['directories'])} placeholders)")
+
+
+if __name__ == "__main__":
+    main()
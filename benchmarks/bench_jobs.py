@@ -0,0 +1,62 @@
+# Archiving a large selection through the background job queue: throughput as the number of
+# queue workers grows, against the in-memory blob stand-in. Each job moves one chunk of files.
+#
+#   python benchmarks/bench_jobs.py --files 2000 --chunk 200 --workers 1 2 4 8 --latency-ms 20
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from blob_moves import move_blobs  # noqa: E402
+from fake_blob import FakeBlobStore, FakeContainerClient  # noqa: E402
+from jobs import JobQueue  # noqa: E402
+
+SOURCE = "placements-2024"
+ARCHIVE = "archive"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--chunk", type=int, default=200, help="files per job")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--move-threads", type=int, default=4, help="copy threads inside each job")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    store = FakeBlobStore(latency=args.latency_ms / 1000)
+    source, archive = FakeContainerClient(store, SOURCE), FakeContainerClient(store, ARCHIVE)
+
+    def run_move_job(job):
+        moves = job.payload["moves"]
+        results = move_blobs(source, archive, moves, max_workers=args.move_threads,
+                             progress=lambda done, total, result: job.progress(done, total))
+        return {"moved": sum(result.ok for result in results)}
+
+    print(f"{args.files} files in jobs of {args.chunk}, {args.move_threads} copy threads per job, "
+          f"{args.latency_ms} ms per call")
+    print(f"{'workers':>7} {'elapsed':>8} {'files/s':>8}")
+    for workers in args.workers:
+        store.containers.clear()
+        for i in range(args.files):
+            store.put(SOURCE, f"CSE/2024/R{i // 5:04d}/doc{i % 5}.pdf", data=b"%PDF")
+        names = sorted(store.container(SOURCE))
+        queue = JobQueue(os.path.join(tempfile.mkdtemp(), "jobs.sqlite3"), {"move": run_move_job}, workers=workers)
+        started = time.perf_counter()
+        group_id = queue.submit("move", [{"moves": [[name, name] for name in names[start:start + args.chunk]]}
+                                         for start in range(0, len(names), args.chunk)])
+        queue.start()
+        while not queue.group(group_id)["finished"]:
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        queue.stop()
+        moved = sum(job["result"]["moved"] for job in queue.group(group_id)["jobs"])
+        assert moved == args.files, moved
+        print(f"{workers:>7} {elapsed:>7.2f}s {args.files / elapsed:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# A burst of concurrent logins, as when results are announced: the old plaintext query on a fresh
+# connection per login, get_user_details (hashed passwords, pooled connections, cached user
+# records), and restoring a session from its signed token. Reports logins/s, p95 and DB round trips.
+#
+#   python benchmarks/bench_login.py --logins 1000 --threads 64 --kdf-iterations 20000
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+import headless  # noqa: E402
+
+headless.install()
+
+import app  # noqa: E402
+import auth  # noqa: E402
+import backends  # noqa: E402
+from query_cache import users_cache  # noqa: E402
+from sqlite_backend import RoundTrips, SQLiteConnection, create_schema  # noqa: E402
+
+PASSWORD = "placement-2024"
+
+
+def seed(connect, users):
+    # Every user shares a password, hashed once: seeding 1,000 users at full KDF cost would take minutes.
+    password_hash = auth.hash_password(PASSWORD)
+    connection = connect()
+    with connection.cursor() as cursor:
+        cursor.executemany("INSERT INTO users (email, password, role, name, roll_number) VALUES (%s, %s, %s, %s, %s)",
+                           [(f"student{i}@college.edu", password_hash, app.USER_ROLE_ACCESSOR, f"Student {i}",
+                             f"CSE{i:04d}") for i in range(users)])
+    connection.commit()
+    connection.close()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def burst(label, login, emails, threads, round_trips):
+    def timed(email):
+        started = time.perf_counter()
+        assert login(email), email
+        return time.perf_counter() - started
+
+    before = round_trips.total
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(timed, emails))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {len(emails) / elapsed:>9.0f} {percentile(latencies, 0.95) * 1000:>8.1f}ms "
+          f"{round_trips.total - before:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=64, help="concurrent logins in flight")
+    parser.add_argument("--kdf-iterations", type=int, default=auth.KDF_ITERATIONS,
+                        help="PBKDF2 cost; lower it to run the burst quickly on a small machine")
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    parser.add_argument("--db-handshake-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    auth.KDF_ITERATIONS = args.kdf_iterations
+    db_path = os.path.join(tempfile.mkdtemp(), "portal.sqlite3")
+    create_schema(db_path)
+    round_trips = RoundTrips()
+
+    def connect():
+        return SQLiteConnection(db_path, handshake_latency=args.db_handshake_ms / 1000,
+                                query_latency=args.db_latency_ms / 1000, round_trips=round_trips)
+
+    seed(connect, args.logins)
+    backends.override(db_connect=connect)
+    emails = [f"student{i}@college.edu" for i in range(args.logins)]
+
+    def plaintext_login(email):
+        # The previous get_user_details: a new connection and a password comparison in SQL.
+        connection = connect()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT role, name, roll_number FROM users WHERE email=%s AND password=%s",
+                               (email, auth.DUMMY_HASH))
+                cursor.fetchone()
+            return True
+        finally:
+            connection.close()
+
+    def hashed_login(email):
+        return app.get_user_details(email, PASSWORD)[0] is not None
+
+    tokens = {email: app.issue_session_token(email) for email in emails}
+
+    def token_restore(email):
+        # The signature is checked locally; the version and role are read from the users table.
+        return app.load_session(tokens[email]) is not None
+
+    print(f"{args.logins} logins, {args.threads} in flight, PBKDF2 x{args.kdf_iterations}, "
+          f"{args.db_latency_ms} ms per query, {args.db_handshake_ms} ms per connection")
+    print(f"{'path':<34} {'logins/s':>9} {'p95':>10} {'DB trips':>10}")
+    burst("plaintext, connection per login", plaintext_login, emails, args.threads, round_trips)
+    users_cache.clear()
+    burst("hashed, pooled, cold user cache", hashed_login, emails, args.threads, round_trips)
+    burst("hashed, pooled, warm user cache", hashed_login, emails, args.threads, round_trips)
+    burst("session token restore", token_restore, emails, args.threads, round_trips)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# Drives uploader_page, file_manager_page and view_and_download_files_page headlessly for N
+# simulated users against in-process fake Blob Storage and MySQL backends, and reports
+# render latency and backend round trips per render.
+#
+#   python benchmarks/bench_pages.py --users 20 --renders 10 --blob-latency-ms 15 --db-latency-ms 2
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+import headless  # noqa: E402
+
+headless.install()
+
+import app  # noqa: E402
+import backends  # noqa: E402
+from fake_blob import FakeBlobServiceClient, FakeBlobStore  # noqa: E402
+from sqlite_backend import RoundTrips, SQLiteConnection, create_schema  # noqa: E402
+
+DEPARTMENTS = ("CSE", "ECE", "MECH")
+DOCUMENTS = ("offer_letter.pdf", "resume.pdf", "marksheet.pdf", "id_card.pdf", "noc.pdf")
+
+
+def seed(store, roll_numbers):
+    for container in (app.container_name, app.archive_container):
+        for department in DEPARTMENTS:
+            store.put(container, f"{department}/2024/", data=b"")
+            for roll in range(roll_numbers):
+                for document in DOCUMENTS:
+                    store.put(container, f"{department}/2024/{department}{roll:04d}/{document}", data=b"%PDF" * 256)
+
+
+def flows(selected):
+    pick = lambda options: options[:selected]  # noqa: E731
+    return {
+        "uploader_page": (app.uploader_page, {}),
+        "file_manager_page": (app.file_manager_page, {"Select files on this page": pick}),
+        "view_and_download_files_page": (app.view_and_download_files_page, {"Select files on this page": pick}),
+    }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--renders", type=int, default=10, help="renders of each page per user")
+    parser.add_argument("--roll-numbers", type=int, default=200, help="roll numbers per department")
+    parser.add_argument("--selected", type=int, default=20, help="files ticked on each listing page")
+    parser.add_argument("--blob-latency-ms", type=float, default=15.0)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    parser.add_argument("--db-handshake-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    store = FakeBlobStore(latency=args.blob_latency_ms / 1000)
+    seed(store, args.roll_numbers)
+    db_path = os.path.join(tempfile.mkdtemp(), "portal.sqlite3")
+    create_schema(db_path, departments=DEPARTMENTS)
+    app.BLOB_CACHE_DIR = os.path.join(os.path.dirname(db_path), "blobs")
+    app.ZIP_CACHE_DIR = os.path.join(os.path.dirname(db_path), "zips")
+    round_trips = RoundTrips()
+    backends.override(
+        blob_service_client=FakeBlobServiceClient(store),
+        db_connect=lambda: SQLiteConnection(db_path, handshake_latency=args.db_handshake_ms / 1000,
+                                            query_latency=args.db_latency_ms / 1000, round_trips=round_trips),
+    )
+
+    # Pages browse the files manifest, so build it from the seeded containers first.
+    for container in (app.container_name, app.archive_container):
+        app.reconcile_manifest(container)
+
+    results = defaultdict(list)
+    results_lock = threading.Lock()
+
+    def user(number):
+        headless.set_answers({})
+        app.st.session_state.user_role = app.USER_ROLE_MANAGER
+        app.st.session_state.user_name = f"user{number}"
+        app.st.session_state.roll_number = f"CSE{number:04d}"
+        app.st.session_state.rejected_files = []
+        for _ in range(args.renders):
+            for page, (render, answers) in flows(args.selected).items():
+                headless.set_answers(answers)
+                blob_before = store.thread_calls()
+                db_before = round_trips.current_thread()
+                started = time.perf_counter()
+                render()
+                elapsed = time.perf_counter() - started
+                sample = (elapsed, store.thread_calls() - blob_before, round_trips.current_thread() - db_before)
+                with results_lock:
+                    results[page].append(sample)
+
+    threads = [threading.Thread(target=user, args=(number,)) for number in range(args.users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    print(f"{args.users} users x {args.renders} renders/page, {args.roll_numbers} roll numbers x "
+          f"{len(DEPARTMENTS)} departments, blob latency {args.blob_latency_ms} ms, "
+          f"db latency {args.db_latency_ms} ms (+{args.db_handshake_ms} ms handshake)")
+    print(f"{'page':<30} {'renders':>7} {'p50 ms':>8} {'p95 ms':>8} {'blob/render':>12} {'db/render':>10}")
+    for page, samples in results.items():
+        latencies = [sample[0] * 1000 for sample in samples]
+        print(f"{page:<30} {len(samples):>7} {percentile(latencies, 0.5):>8.1f} {percentile(latencies, 0.95):>8.1f} "
+              f"{statistics.mean(sample[1] for sample in samples):>12.2f} "
+              f"{statistics.mean(sample[2] for sample in samples):>10.2f}")
+    print(f"wall time {wall:.2f}s, blob calls by operation: {dict(store.calls)}")
+    print(f"db pool: {app.get_db_pool().stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Throughput of logging rejections: the old rewrite-the-whole-Excel-workbook log,
+# one INSERT + commit per rejection, and batched executemany inserts. Then re-uploads: the old
+# UPDATE of every rejection in the directory vs. resolving only the re-uploaded file.
+#
+#   python benchmarks/bench_rejections.py --rows 10000 --excel-rows 200
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from rejections import (INSERT_SQL, REJECTION_INDEXES, export_rejections, log_rejections,  # noqa: E402
+                        pending_rejections, resolve_rejections)
+from sqlite_backend import SQLiteConnection, create_schema  # noqa: E402
+
+
+def make_rows(count):
+    return [("CSE", "2024", f"R{i % 600:04d}", f"offer_{i}.pdf", "Unsigned document") for i in range(count)]
+
+
+def excel_log(path, rows):
+    import pandas as pd
+
+    for roll_number, file_name, reason in ((row[2], row[3], row[4]) for row in rows):
+        try:
+            df = pd.read_excel(path)
+        except FileNotFoundError:
+            df = pd.DataFrame(columns=["Roll Number", "File Name", "Reason"])
+        new_entry = pd.DataFrame([[roll_number, file_name, reason]], columns=["Roll Number", "File Name", "Reason"])
+        df = pd.concat([df, new_entry], ignore_index=True)
+        df.to_excel(path, index=False)
+
+
+def report(label, count, elapsed):
+    print(f"{label:<16} rows={count:<6} elapsed={elapsed:7.2f}s  rows/s={count / elapsed:9.0f}")
+
+
+def fresh_connection():
+    path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    create_schema(path)
+    connection = SQLiteConnection(path)
+    with connection.cursor() as cursor:
+        for name, columns in REJECTION_INDEXES.items():
+            cursor.execute(f"CREATE INDEX {name} ON rejection_logs {columns}")
+    connection.commit()
+    return connection
+
+
+def _blanket_resolve(connection, row):
+    with connection.cursor() as cursor:
+        cursor.execute("UPDATE rejection_logs SET resolved = 1 WHERE directory = %s AND roll_number = %s",
+                       (row[1], row[2]))
+        resolved = cursor.rowcount
+    connection.commit()
+    return resolved
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--excel-rows", type=int, default=0,
+                        help="also time the legacy Excel log for this many rows (needs pandas + openpyxl)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--uploads", type=int, default=1000, help="re-uploads of rejected files")
+    args = parser.parse_args()
+    rows = make_rows(args.rows)
+
+    if args.excel_rows:
+        path = os.path.join(tempfile.mkdtemp(), "rejections_log.xlsx")
+        started = time.perf_counter()
+        excel_log(path, rows[:args.excel_rows])
+        report("excel rewrite", args.excel_rows, time.perf_counter() - started)
+
+    connection = fresh_connection()
+    started = time.perf_counter()
+    for row in rows:
+        with connection.cursor() as cursor:
+            cursor.execute(INSERT_SQL, row)
+        connection.commit()
+    report("insert+commit", len(rows), time.perf_counter() - started)
+
+    connection = fresh_connection()
+    started = time.perf_counter()
+    for start in range(0, len(rows), args.batch_size):
+        log_rejections(connection, rows[start:start + args.batch_size], batch_size=args.batch_size)
+    report("batched", len(rows), time.perf_counter() - started)
+
+    # Each re-upload replaces one rejected file; the old UPDATE also resolved its neighbours.
+    uploads = rows[:args.uploads]
+    for label, resolve in (
+            ("blanket update", lambda connection, row: _blanket_resolve(connection, row)),
+            ("per-file", lambda connection, row: sum(resolve_rejections(connection, [row[:4]]).values()))):
+        connection = fresh_connection()
+        log_rejections(connection, rows)
+        started = time.perf_counter()
+        resolved = sum(resolve(connection, row) for row in uploads)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<16} uploads={len(uploads):<6} elapsed={elapsed:7.2f}s  rows updated={resolved}")
+
+    started = time.perf_counter()
+    for roll in range(args.uploads):
+        pending_rejections(connection, f"NEW{roll:05d}")
+    print(f"pending check for roll numbers with none: {(time.perf_counter() - started) / args.uploads * 1e6:.0f} us each")
+
+    export_path = os.path.join(tempfile.mkdtemp(), "rejection_logs.csv")
+    started = time.perf_counter()
+    first = export_rejections(connection, export_path)
+    log_rejections(connection, make_rows(100))
+    second = export_rejections(connection, export_path)
+    print(f"csv export: {first} rows, then {second} incremental rows, {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Cold start of a portal process: importing app.py, the first render (login page, then a
+# logged-in page that builds the DB pool), a warm render, and re-executing the script as
+# Streamlit does on every rerun. Each run is a fresh interpreter. --eager also imports the
+# modules app.py used to import at the top (pandas, the Azure SDK, pymysql) to compare.
+#
+#   python benchmarks/bench_startup.py --runs 5
+import argparse
+import json
+import os
+import runpy
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(BENCH_DIR, "..", "app.py")
+EAGER_MODULES = ("pandas", "azure.storage.blob", "pymysql")
+
+
+def child(eager):
+    sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+    started = time.perf_counter()
+    import headless
+
+    headless.install()
+    skipped = []
+    if eager:
+        for name in EAGER_MODULES:
+            try:
+                __import__(name)
+            except ImportError:
+                skipped.append(name)
+    import app
+    import backends
+    from fake_blob import FakeBlobServiceClient, FakeBlobStore
+    from sqlite_backend import SQLiteConnection, create_schema
+
+    timings = {"import": time.perf_counter() - started}
+    db_path = os.path.join(tempfile.mkdtemp(), "portal.sqlite3")
+    create_schema(db_path, departments=("CSE", "ECE"))
+    app.JOB_DB_PATH = os.path.join(os.path.dirname(db_path), "jobs.sqlite3")
+    app.BLOB_CACHE_DIR = os.path.join(os.path.dirname(db_path), "blobs")
+    app.ZIP_CACHE_DIR = os.path.join(os.path.dirname(db_path), "zips")
+    backends.override(blob_service_client=FakeBlobServiceClient(FakeBlobStore()),
+                      db_connect=lambda: SQLiteConnection(db_path))
+
+    started = time.perf_counter()
+    app.main()
+    timings["login render"] = time.perf_counter() - started
+
+    app.st.session_state.user_role = app.USER_ROLE_ACCESSOR
+    app.st.session_state.user_name = "student"
+    app.st.session_state.roll_number = "CSE0001"
+    for label in ("first page render", "warm page render"):
+        started = time.perf_counter()
+        app.view_and_download_files_page()
+        timings[label] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    runpy.run_path(APP_PATH, run_name="rerun")
+    timings["script rerun"] = time.perf_counter() - started
+    print(json.dumps({"timings": timings, "skipped": skipped}))
+
+
+def run(eager, runs):
+    samples = []
+    skipped = []
+    for _ in range(runs):
+        command = [sys.executable, os.path.abspath(__file__), "--child"] + (["--eager"] if eager else [])
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result["timings"])
+        skipped = result["skipped"]
+    return {label: statistics.median(sample[label] for sample in samples) for label in samples[0]}, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per mode")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--eager", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.eager)
+        return
+
+    results = {}
+    for label, eager in (("eager imports", True), ("lazy imports", False)):
+        results[label], skipped = run(eager, args.runs)
+        if skipped:
+            print(f"{label}: {', '.join(skipped)} not installed, not imported")
+    phases = list(next(iter(results.values())))
+    print(f"median of {args.runs} fresh processes, ms")
+    print(f"{'mode':<16}" + "".join(f"{phase:>18}" for phase in phases) + f"{'to first page':>16}")
+    for label, timings in results.items():
+        to_first_page = timings["import"] + timings["login render"] + timings["first page render"]
+        print(f"{label:<16}" + "".join(f"{timings[phase] * 1000:>18.1f}" for phase in phases)
+              + f"{to_first_page * 1000:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
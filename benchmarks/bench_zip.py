@@ -0,0 +1,73 @@
+# Peak memory of building a "Select All" zip: the old BytesIO-per-file + in-memory
+# ZIP_DEFLATED approach vs. the streaming builder in zip_builder.py.
+#
+#   python benchmarks/bench_zip.py                   # 2 GB synthetic selection, streaming only
+#   python benchmarks/bench_zip.py --total-mb 256 --legacy
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import zipfile
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fake_blob import FakeBlobStore, FakeContainerClient  # noqa: E402
+from zip_builder import build_zip  # noqa: E402
+
+
+def legacy_zip(container_client, blob_names):
+    files = []
+    for blob_name in blob_names:
+        stream = BytesIO()
+        container_client.get_blob_client(blob_name).download_blob().readinto(stream)
+        stream.seek(0)
+        files.append((os.path.basename(blob_name), stream))
+    zip_buffer = BytesIO()
+    with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED) as zip_file:
+        for file_name, file_stream in files:
+            zip_file.writestr(file_name, file_stream.read())
+    zip_buffer.seek(0)
+    return zip_buffer
+
+
+def measure(label, build):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result.seek(0, os.SEEK_END)
+    size = result.tell()
+    result.close()
+    print(f"{label:<10} archive={size / 2**20:8.1f} MiB  peak_python_memory={peak / 2**20:8.1f} MiB  "
+          f"elapsed={elapsed:6.2f}s  throughput={size / 2**20 / elapsed:7.1f} MiB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--total-mb", type=int, default=2048)
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--chunk-mb", type=int, default=4)
+    parser.add_argument("--spool-mb", type=int, default=16)
+    parser.add_argument("--legacy", action="store_true", help="also run the old in-memory builder")
+    args = parser.parse_args()
+
+    store = FakeBlobStore(chunk_size=args.chunk_mb * 2**20)
+    file_size = args.total_mb * 2**20 // args.files
+    blob_names = [f"CSE/2024/R{i:04d}/offer_letter.pdf" for i in range(args.files)]
+    for blob_name in blob_names:
+        store.put("archive", blob_name, size=file_size)
+    container_client = FakeContainerClient(store, "archive")
+    print(f"selection: {args.files} PDFs, {args.total_mb} MiB total, chunk={args.chunk_mb} MiB, "
+          f"spool limit={args.spool_mb} MiB")
+
+    measure("streaming", lambda: build_zip(container_client, blob_names, spool_limit=args.spool_mb * 2**20))
+    if args.legacy:
+        measure("legacy", lambda: legacy_zip(container_client, blob_names))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+_PATTERN = os.urandom(1024 * 1024)
+_etags = itertools.count(1)
+
+
+class BlobNotFound(KeyError):
+    # Like azure.core.exceptions.ResourceNotFoundError, which carries the HTTP status.
+    status_code = 404
+
+
+class FakeBlob:
+    def __init__(self, data=None, size=None, metadata=None):
+        # Synthetic blobs only record a size and generate incompressible content on demand.
+        self.data = data
+        self.size = len(data) if data is not None else size
+        self.metadata = dict(metadata or {})
+        self.last_modified = datetime.now(timezone.utc)
+        self.etag = f'"0x{next(_etags):016X}"'
+
+    def iter_chunks(self, chunk_size):
+        if self.data is not None:
+            for offset in range(0, self.size, chunk_size):
+                yield self.data[offset:offset + chunk_size]
+            return
+        remaining = self.size
+        while remaining > 0:
+            length = min(chunk_size, remaining)
+            repeats = -(-length // len(_PATTERN))
+            yield (_PATTERN * repeats)[:length]
+            remaining -= length
+
+
+class FakeBlobStore:
+    def __init__(self, chunk_size=4 * 1024 * 1024, latency=0.0, bandwidth=None):
+        self.chunk_size = chunk_size
+        # Simulated round-trip time added to every service call, and per-connection
+        # upload bandwidth in bytes/second (None means unlimited).
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.containers = {}
+        self.blocks = {}
+        # Set to a number to make stage_block fail after that many more blocks.
+        self.fail_after_blocks = None
+        self.calls = Counter()
+        self.calls_by_thread = Counter()
+        self.lock = threading.Lock()
+        self._local = threading.local()
+
+    def container(self, name):
+        return self.containers.setdefault(name, {})
+
+    def thread_calls(self):
+        with self.lock:
+            return self.calls_by_thread[threading.get_ident()]
+
+    def put(self, container, blob_name, data=None, size=None, metadata=None):
+        self.container(container)[blob_name] = FakeBlob(data=data, size=size, metadata=metadata)
+
+    def count(self, operation):
+        with self.lock:
+            self.calls[operation] += 1
+            self.calls_by_thread[threading.get_ident()] += 1
+        if self.latency and not getattr(self._local, "async_call", False):
+            time.sleep(self.latency)
+
+    def transfer(self, size):
+        if self.bandwidth and not getattr(self._local, "async_call", False):
+            time.sleep(size / self.bandwidth)
+
+    async def call(self, func, *args, **kwargs):
+        # Async clients wait on the event loop instead, then run the sync operation without sleeping.
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._local.async_call = True
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._local.async_call = False
+
+
+def _properties(name, blob):
+    return SimpleNamespace(name=name, size=blob.size, etag=blob.etag, last_modified=blob.last_modified,
+                           metadata=dict(blob.metadata),
+                           copy=SimpleNamespace(status="success", status_description=None))
+
+
+class FakeDownloader:
+    def __init__(self, store, name, blob):
+        self._store = store
+        self._blob = blob
+        self.properties = _properties(name, blob)
+        self.size = blob.size
+
+    def chunks(self):
+        return self._blob.iter_chunks(self._store.chunk_size)
+
+    def readinto(self, stream):
+        for chunk in self.chunks():
+            stream.write(chunk)
+        return self.size
+
+    def readall(self):
+        return b"".join(self.chunks())
+
+
+class FakeBlobClient:
+    def __init__(self, store, container, blob_name):
+        self._store = store
+        self.container_name = container
+        self.blob_name = blob_name
+        self.url = f"https://fake.blob.core.windows.net/{container}/{blob_name}"
+
+    def _blob(self):
+        blob = self._store.container(self.container_name).get(self.blob_name)
+        if blob is None:
+            raise BlobNotFound(f"{self.container_name}/{self.blob_name} not found")
+        return blob
+
+    def download_blob(self):
+        self._store.count("download_blob")
+        return FakeDownloader(self._store, self.blob_name, self._blob())
+
+    def get_blob_properties(self):
+        self._store.count("get_blob_properties")
+        return _properties(self.blob_name, self._blob())
+
+    def upload_blob(self, data, overwrite=False, **kwargs):
+        self._store.count("upload_blob")
+        if hasattr(data, "read"):
+            data = data.read()
+        self._store.transfer(len(data))
+        self._store.put(self.container_name, self.blob_name, data=bytes(data), metadata=kwargs.get("metadata"))
+        blob = self._blob()
+        return {"etag": blob.etag, "last_modified": blob.last_modified}
+
+    def stage_block(self, block_id, data, **kwargs):
+        self._store.count("stage_block")
+        with self._store.lock:
+            if self._store.fail_after_blocks is not None:
+                if self._store.fail_after_blocks <= 0:
+                    raise ConnectionError("simulated network drop")
+                self._store.fail_after_blocks -= 1
+        self._store.transfer(len(data))
+        with self._store.lock:
+            self._store.blocks.setdefault((self.container_name, self.blob_name), {})[block_id] = bytes(data)
+
+    def get_block_list(self, block_list_type="committed"):
+        self._store.count("get_block_list")
+        with self._store.lock:
+            staged = self._store.blocks.get((self.container_name, self.blob_name), {})
+            return [], [SimpleNamespace(id=block_id, size=len(data)) for block_id, data in staged.items()]
+
+    def commit_block_list(self, block_list, **kwargs):
+        self._store.count("commit_block_list")
+        with self._store.lock:
+            staged = self._store.blocks.pop((self.container_name, self.blob_name), {})
+        data = b"".join(staged[block.id] for block in block_list)
+        self._store.put(self.container_name, self.blob_name, data=data, metadata=kwargs.get("metadata"))
+        blob = self._blob()
+        return {"etag": blob.etag, "last_modified": blob.last_modified}
+
+    def delete_blob(self):
+        self._store.count("delete_blob")
+        self._store.container(self.container_name).pop(self.blob_name)
+
+    def start_copy_from_url(self, url):
+        self._store.count("start_copy_from_url")
+        container, blob_name = url.split(".net/", 1)[1].split("/", 1)
+        source = self._store.container(container)[blob_name]
+        self._store.put(self.container_name, self.blob_name, data=source.data, size=source.size,
+                        metadata=source.metadata)
+        blob = self._blob()
+        return {"copy_status": "success", "etag": blob.etag, "last_modified": blob.last_modified}
+
+
+class FakeItemPaged:
+    # Like azure.core.paging.ItemPaged: iterating lists everything, by_page() returns pages that
+    # each cost one service call, with the continuation token for the next one.
+    def __init__(self, store, container_name, prefix, page_size):
+        self._store = store
+        self._container_name = container_name
+        self._prefix = prefix
+        self._page_size = page_size
+
+    def __iter__(self):
+        for page in self.by_page():
+            yield from page
+
+    def by_page(self, continuation_token=None):
+        return FakePageIterator(self._store, self._container_name, self._prefix, self._page_size,
+                                continuation_token)
+
+
+class FakePageIterator:
+    def __init__(self, store, container_name, prefix, page_size, continuation_token):
+        self._store = store
+        self._container_name = container_name
+        self._prefix = prefix
+        self._page_size = page_size
+        self._start = int(continuation_token) if continuation_token else 0
+        self._done = False
+        self.continuation_token = continuation_token
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        self._store.count("list_blobs")
+        blobs = self._store.container(self._container_name)
+        names = [name for name in sorted(blobs) if self._prefix is None or name.startswith(self._prefix)]
+        end = self._start + self._page_size
+        page = [_properties(name, blobs[name]) for name in names[self._start:end]]
+        self._start = end
+        self.continuation_token = str(end) if end < len(names) else None
+        self._done = self.continuation_token is None
+        return iter(page)
+
+
+class FakeContainerClient:
+    def __init__(self, store, container_name):
+        self._store = store
+        self.container_name = container_name
+
+    def get_blob_client(self, blob_name):
+        return FakeBlobClient(self._store, self.container_name, blob_name)
+
+    def list_blobs(self, name_starts_with=None, results_per_page=None, **kwargs):
+        return FakeItemPaged(self._store, self.container_name, name_starts_with, results_per_page or 5000)
+
+    def delete_blobs(self, *blob_names, **kwargs):
+        self._store.count("delete_blobs")
+        responses = []
+        for blob_name in blob_names:
+            found = self._store.container(self.container_name).pop(blob_name, None) is not None
+            responses.append(SimpleNamespace(status_code=202 if found else 404))
+        return iter(responses)
+
+
+class FakeBlobServiceClient:
+    def __init__(self, store=None):
+        self.store = store or FakeBlobStore()
+
+    def get_container_client(self, container_name):
+        return FakeContainerClient(self.store, container_name)
+
+
+class FakeAsyncDownloader:
+    def __init__(self, downloader):
+        self._downloader = downloader
+        self.properties = downloader.properties
+        self.size = downloader.size
+
+    async def readinto(self, stream):
+        return self._downloader.readinto(stream)
+
+    async def readall(self):
+        return self._downloader.readall()
+
+
+class FakeAsyncBlobClient:
+    # Mirrors azure.storage.blob.aio.BlobClient for the operations the portal uses.
+    def __init__(self, store, container, blob_name):
+        self._store = store
+        self._sync = FakeBlobClient(store, container, blob_name)
+        self.container_name = container
+        self.blob_name = blob_name
+        self.url = self._sync.url
+
+    async def download_blob(self):
+        return FakeAsyncDownloader(await self._store.call(self._sync.download_blob))
+
+    async def get_blob_properties(self):
+        return await self._store.call(self._sync.get_blob_properties)
+
+    async def upload_blob(self, data, overwrite=False, **kwargs):
+        return await self._store.call(self._sync.upload_blob, data, overwrite=overwrite, **kwargs)
+
+    async def delete_blob(self):
+        return await self._store.call(self._sync.delete_blob)
+
+    async def start_copy_from_url(self, url):
+        return await self._store.call(self._sync.start_copy_from_url, url)
+
+
+class FakeAsyncContainerClient:
+    def __init__(self, store, container_name):
+        self._store = store
+        self._sync = FakeContainerClient(store, container_name)
+        self.container_name = container_name
+
+    def get_blob_client(self, blob_name):
+        return FakeAsyncBlobClient(self._store, self.container_name, blob_name)
+
+    async def list_blobs(self, name_starts_with=None, **kwargs):
+        for blob in await self._store.call(lambda: list(self._sync.list_blobs(name_starts_with=name_starts_with))):
+            yield blob
+
+
+class FakeAsyncBlobServiceClient:
+    def __init__(self, store=None):
+        self.store = store or FakeBlobStore()
+
+    def get_container_client(self, container_name):
+        return FakeAsyncContainerClient(self.store, container_name)
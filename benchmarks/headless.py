@@ -0,0 +1,148 @@
+import sys
+import threading
+
+# A minimal stand-in for the streamlit module, enough to run the portal's pages without a
+# browser. Widgets answer from a per-session dict keyed by label (or key); everything else
+# is a no-op. Each thread is its own session.
+_local = threading.local()
+
+
+class SessionState(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+class _SessionStateProxy:
+    def _state(self):
+        if not hasattr(_local, "state"):
+            _local.state = SessionState()
+        return _local.state
+
+    def __getattr__(self, name):
+        return getattr(self._state(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._state(), name, value)
+
+    def __contains__(self, name):
+        return name in self._state()
+
+    def __getitem__(self, name):
+        return self._state()[name]
+
+    def __setitem__(self, name, value):
+        self._state()[name] = value
+
+    def __delitem__(self, name):
+        del self._state()[name]
+
+    def get(self, name, default=None):
+        return self._state().get(name, default)
+
+    def clear(self):
+        self._state().clear()
+
+
+class _Element:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+
+class RerunRequested(Exception):
+    pass
+
+
+def _answers():
+    if not hasattr(_local, "answers"):
+        _local.answers = {}
+    return _local.answers
+
+
+def set_answers(answers):
+    _local.answers = answers
+
+
+def _answer(label, key, default):
+    answers = _answers()
+    if key is not None and key in answers:
+        return answers[key]
+    return answers.get(label, default)
+
+
+class FakeStreamlit:
+    session_state = _SessionStateProxy()
+
+    def __init__(self):
+        self.sidebar = self
+
+    def selectbox(self, label, options, index=0, key=None, **kwargs):
+        options = list(options)
+        value = _answer(label, key, None)
+        if callable(value):
+            return value(options)
+        if value is not None:
+            return value
+        return options[index] if options else None
+
+    def multiselect(self, label, options, default=None, key=None, **kwargs):
+        value = _answer(label, key, default or [])
+        return value(list(options)) if callable(value) else value
+
+    def radio(self, label, options, index=0, key=None, **kwargs):
+        return self.selectbox(label, options, index=index, key=key)
+
+    def checkbox(self, label, value=False, key=None, **kwargs):
+        return _answer(label, key, value)
+
+    def button(self, label, key=None, **kwargs):
+        return _answer(label, key, False)
+
+    def text_input(self, label, value="", key=None, **kwargs):
+        return _answer(label, key, value)
+
+    def text_area(self, label, value="", key=None, **kwargs):
+        return _answer(label, key, value)
+
+    def file_uploader(self, label, key=None, **kwargs):
+        return _answer(label, key, None)
+
+    def download_button(self, label, data, **kwargs):
+        if hasattr(data, "read"):
+            data.read()
+        return False
+
+    def experimental_rerun(self):
+        raise RerunRequested()
+
+    def experimental_get_query_params(self):
+        if not hasattr(_local, "query_params"):
+            _local.query_params = {}
+        return dict(_local.query_params)
+
+    def experimental_set_query_params(self, **params):
+        _local.query_params = {name: [value] for name, value in params.items() if value is not None}
+
+    def experimental_singleton(self, func):
+        return func
+
+    def progress(self, *args, **kwargs):
+        return _Element()
+
+    def empty(self):
+        return _Element()
+
+    def __getattr__(self, name):
+        # title, header, write, success, error, warning, table, ...
+        return lambda *args, **kwargs: _Element()
+
+
+def install():
+    module = FakeStreamlit()
+    sys.modules["streamlit"] = module
+    return module
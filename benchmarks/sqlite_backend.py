@@ -0,0 +1,155 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+_SHOW_INDEX = re.compile(r"^\s*SHOW INDEX FROM (\w+)\s*$", re.IGNORECASE)
+_SHOW_COLUMNS = re.compile(r"^\s*SHOW COLUMNS FROM (\w+)\s*$", re.IGNORECASE)
+_SHOW_TABLES = re.compile(r"^\s*SHOW TABLES LIKE '(\w+)'\s*$", re.IGNORECASE)
+_VALUES_FUNCTION = re.compile(r"\bVALUES\((\w+)\)")
+
+
+def _translate(sql):
+    # MySQL's upsert becomes SQLite's (3.35+ allows ON CONFLICT without a target).
+    if "ON DUPLICATE KEY UPDATE" in sql:
+        head, assignments = sql.split("ON DUPLICATE KEY UPDATE")
+        sql = head + "ON CONFLICT DO UPDATE SET" + _VALUES_FUNCTION.sub(r"excluded.\1", assignments)
+    return sql.replace("%s", "?")
+
+# DATETIME columns round-trip as datetime objects, as they do through pymysql.
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+
+class RoundTrips:
+    # Counts statements per thread, so a benchmark can attribute DB round trips to one page render.
+    def __init__(self):
+        self.total = 0
+        self.by_thread = Counter()
+        self._lock = threading.Lock()
+
+    def add(self):
+        with self._lock:
+            self.total += 1
+            self.by_thread[threading.get_ident()] += 1
+
+    def current_thread(self):
+        with self._lock:
+            return self.by_thread[threading.get_ident()]
+
+
+class _Cursor:
+    def __init__(self, cursor, connection):
+        self._cursor = cursor
+        self._connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _rows(self, rows):
+        columns = [column[0] for column in self._cursor.description or ()]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def execute(self, sql, args=()):
+        self._connection.round_trip()
+        show_index = _SHOW_INDEX.match(sql)
+        show_columns = _SHOW_COLUMNS.match(sql)
+        show_tables = _SHOW_TABLES.match(sql)
+        if show_index:
+            sql = f"SELECT name AS Key_name FROM pragma_index_list('{show_index.group(1)}')"
+        elif show_columns:
+            sql = f"SELECT name AS Field FROM pragma_table_info('{show_columns.group(1)}')"
+        elif show_tables:
+            sql = f"SELECT name FROM sqlite_master WHERE type='table' AND name='{show_tables.group(1)}'"
+        self._cursor.execute(_translate(sql), args)
+        return self._cursor.rowcount
+
+    def executemany(self, sql, rows):
+        self._connection.round_trip()
+        self._cursor.executemany(_translate(sql), rows)
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return self._rows([row])[0] if row is not None else None
+
+    def fetchall(self):
+        return self._rows(self._cursor.fetchall())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    # Quacks like a pymysql DictCursor connection: %s placeholders, dict rows, ping().
+    # handshake_latency and query_latency simulate the network cost of a real MySQL server.
+    def __init__(self, path, handshake_latency=0.0, query_latency=0.0, round_trips=None):
+        if handshake_latency:
+            time.sleep(handshake_latency)
+        self.query_latency = query_latency
+        self.round_trips = round_trips
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30,
+                                           detect_types=sqlite3.PARSE_DECLTYPES)
+
+    def round_trip(self):
+        if self.round_trips is not None:
+            self.round_trips.add()
+        if self.query_latency:
+            time.sleep(self.query_latency)
+
+    def cursor(self):
+        return _Cursor(self._connection.cursor(), self)
+
+    def ping(self, reconnect=False):
+        self.round_trip()
+        self._connection.execute("SELECT 1")
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self._connection.close()
+
+
+# Text keys compare case-insensitively, like MySQL's default collation.
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS departments (id INTEGER PRIMARY KEY, name TEXT UNIQUE COLLATE NOCASE)",
+    "CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, email TEXT UNIQUE COLLATE NOCASE, password TEXT, "
+    "role TEXT, name TEXT, roll_number TEXT, session_version INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE IF NOT EXISTS rejection_logs (id INTEGER PRIMARY KEY, department TEXT, directory TEXT, "
+    "roll_number TEXT, file_name TEXT, reason TEXT, resolved INTEGER DEFAULT 0)",
+    "CREATE TABLE IF NOT EXISTS rejection_pending (roll_number TEXT PRIMARY KEY, pending INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, container TEXT NOT NULL, blob_name TEXT NOT NULL, "
+    "department TEXT, directory TEXT, roll_number TEXT, file_name TEXT, status TEXT NOT NULL, size INTEGER, "
+    "etag TEXT, uploaded_at DATETIME, sha256 TEXT, UNIQUE (container, blob_name))",
+    "CREATE INDEX IF NOT EXISTS idx_files_browse ON files (container, department, directory, roll_number)",
+    "CREATE INDEX IF NOT EXISTS idx_files_status ON files (status)",
+]
+
+
+def create_schema(path, departments=("CSE", "ECE", "MECH")):
+    connection = sqlite3.connect(path)
+    for statement in SCHEMA:
+        connection.execute(statement)
+    connection.executemany("INSERT OR IGNORE INTO departments (name) VALUES (?)", [(d,) for d in departments])
+    connection.commit()
+    connection.close()
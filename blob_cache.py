@@ -0,0 +1,204 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from tracing import traced
+
+CACHE_MAX_BYTES = 1024 ** 3
+PREFETCH_WORKERS = 8
+
+
+class BlobContentCache:
+    # Local copies of blob contents keyed by container, blob name and etag, evicted LRU by total size.
+    def __init__(self, directory=None, max_bytes=CACHE_MAX_BYTES, prefetch_workers=PREFETCH_WORKERS):
+        # A given directory is emptied first: files left in it by an earlier process aren't
+        # indexed, so they would never be evicted.
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.directory = directory or tempfile.mkdtemp(prefix="blob-cache-")
+        self.max_bytes = max_bytes
+        self.prefetch_workers = prefetch_workers
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes_downloaded": 0, "bytes_served": 0,
+                      "prefetched": 0}
+        self._entries = OrderedDict()
+        self._latest = {}
+        self._size = 0
+        self._inflight = set()
+        self._blob_locks = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _key(self, container_name, blob_name, etag):
+        return hashlib.sha256(f"{container_name}\0{blob_name}\0{etag}".encode()).hexdigest()
+
+    def _pin(self, key, count_miss=True, count_hit=True):
+        # Returns the entry with its reader count raised, or None. A pinned entry's file stays on
+        # disk until it is unpinned, even if the entry is evicted or superseded meanwhile.
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not os.path.exists(entry["path"]):
+                if count_miss:
+                    self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            entry["readers"] += 1
+            if count_hit:
+                self.stats["hits"] += 1
+                self.stats["bytes_served"] += entry["size"]
+            return entry
+
+    def _unpin(self, entry):
+        with self._lock:
+            entry["readers"] -= 1
+            if not entry["readers"] and entry["removed"]:
+                _unlink(entry["path"])
+
+    def contains(self, container_name, blob_name, etag):
+        with self._lock:
+            return self._key(container_name, blob_name, etag) in self._entries
+
+    def store(self, container_name, blob_name, etag, chunks):
+        # Writes chunks to the cache while yielding them, so a caller streaming a blob fills the cache too.
+        handle = tempfile.NamedTemporaryFile(dir=self.directory, delete=False)
+        size = 0
+        try:
+            with handle:
+                for chunk in chunks:
+                    handle.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+        except BaseException:
+            _unlink(handle.name)
+            raise
+        self._insert(container_name, blob_name, etag, handle.name, size)
+
+    def _insert(self, container_name, blob_name, etag, path, size):
+        # Each copy keeps its own file name, so replacing an entry never touches a file being read.
+        key = self._key(container_name, blob_name, etag)
+        with self._lock:
+            self.stats["bytes_downloaded"] += size
+            if key in self._entries:
+                self._remove_locked(key)
+            # A new etag supersedes whatever was cached for the previous version of the blob.
+            previous = self._latest.get((container_name, blob_name))
+            if previous is not None and previous != key and previous in self._entries:
+                self._remove_locked(previous)
+            self._latest[(container_name, blob_name)] = key
+            self._entries[key] = {"path": path, "size": size, "readers": 0, "removed": False}
+            self._size += size
+            # Pinned files are deleted once their readers finish, so disk use can briefly exceed max_bytes.
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._remove_locked(oldest)
+                self.stats["evictions"] += 1
+        return path
+
+    def _remove_locked(self, key):
+        entry = self._entries.pop(key)
+        self._size -= entry["size"]
+        entry["removed"] = True
+        if not entry["readers"]:
+            _unlink(entry["path"])
+
+    def _blob_lock(self, container_name, blob_name):
+        with self._lock:
+            return self._blob_locks.setdefault((container_name, blob_name), threading.Lock())
+
+    @contextmanager
+    def open_blob(self, container_client, blob_name, etag=None):
+        # Yields a binary file on the cached copy, downloading it first on a miss. The copy is
+        # pinned until the block exits.
+        entry = self._fetch(container_client, blob_name, etag)
+        try:
+            with open(entry["path"], "rb") as handle:
+                yield handle
+        finally:
+            self._unpin(entry)
+
+    def _fetch(self, container_client, blob_name, etag):
+        # Returns a pinned entry. Concurrent misses on the same blob (a page fetch racing a
+        # prefetch, say) wait for a single download instead of all fetching it.
+        container_name = container_client.container_name
+        if etag is not None:
+            entry = self._pin(self._key(container_name, blob_name, etag))
+            if entry is not None:
+                return entry
+        with self._blob_lock(container_name, blob_name):
+            if etag is not None:
+                entry = self._pin(self._key(container_name, blob_name, etag), count_miss=False)
+                if entry is not None:
+                    return entry
+            return self._download(container_client, blob_name, etag)
+
+    @traced("blob.download", kind="storage", measure=lambda entry: entry["size"])
+    def _download(self, container_client, blob_name, etag):
+        container_name = container_client.container_name
+        while True:
+            downloader = container_client.get_blob_client(blob_name).download_blob()
+            # Key by the etag of the content actually downloaded, not the one we were told to expect.
+            key = self._key(container_name, blob_name, downloader.properties.etag)
+            if etag is None:
+                entry = self._pin(key)
+                if entry is not None:
+                    return entry
+            for _ in self.store(container_name, blob_name, downloader.properties.etag, downloader.chunks()):
+                pass
+            # Only lost if other downloads evicted it in the meantime.
+            entry = self._pin(key, count_miss=False, count_hit=False)
+            if entry is not None:
+                return entry
+
+    def prefetch(self, container_client, entries):
+        # entries maps blob name -> {"etag": ...}; returns immediately and downloads in the background.
+        container_name = container_client.container_name
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.prefetch_workers,
+                                                    thread_name_prefix="blob-prefetch")
+            todo = []
+            for blob_name, entry in entries.items():
+                key = self._key(container_name, blob_name, entry.get("etag"))
+                if key in self._entries or key in self._inflight:
+                    continue
+                self._inflight.add(key)
+                todo.append((blob_name, entry.get("etag"), key))
+        return [self._executor.submit(self._prefetch_one, container_client, blob_name, etag, key)
+                for blob_name, etag, key in todo]
+
+    def _prefetch_one(self, container_client, blob_name, etag, key):
+        try:
+            if not self.contains(container_client.container_name, blob_name, etag):
+                self._unpin(self._fetch(container_client, blob_name, etag))
+                with self._lock:
+                    self.stats["prefetched"] += 1
+        finally:
+            with self._lock:
+                self._inflight.discard(key)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes_cached"] = self._size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove_locked(key)
+            self._latest.clear()
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
@@ -0,0 +1,280 @@
+import bisect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import traced
+
+MAX_WORKERS = 8
+POLL_INITIAL = 0.2
+POLL_MAX = 5.0
+COPY_TIMEOUT = 300
+# Azure blob batch requests accept at most 256 sub-requests.
+DELETE_BATCH_SIZE = 256
+# Cross-account copies run asynchronously on the service; blobs up to this size are
+# faster to stream through this process than to start and poll a server-side copy.
+STREAM_COPY_MAX = 4 * 1024 * 1024
+
+
+class MoveError(Exception):
+    # result, if given, is what the failed job did get done; the job queue keeps it with the error.
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+class LatencyHistogram:
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+
+    def __init__(self):
+        self._counts = {}
+        self._sums = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method, seconds):
+        with self._lock:
+            counts = self._counts.setdefault(method, [0] * len(self.BUCKETS))
+            counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+            self._sums[method] = self._sums.get(method, 0.0) + seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {method: {"buckets": dict(zip(self.BUCKETS, counts)), "count": sum(counts),
+                             "sum": self._sums[method]}
+                    for method, counts in self._counts.items()}
+
+
+move_latency = LatencyHistogram()
+
+
+class MoveResult:
+    def __init__(self, blob_name, new_blob_name):
+        self.blob_name = blob_name
+        self.new_blob_name = new_blob_name
+        self.ok = False
+        self.error = None
+        self.method = None
+        self.copy_id = None
+        self.size = None
+        self.etag = None
+        self.last_modified = None
+        self.started_at = time.monotonic()
+
+    def __repr__(self):
+        state = "ok" if self.ok else f"error={self.error!r}"
+        return f"MoveResult({self.blob_name!r} -> {self.new_blob_name!r}, {state})"
+
+
+def _should_stream(source_client, dest_client, size):
+    same_account = getattr(source_client, "account_name", None) == getattr(dest_client, "account_name", None)
+    return not same_account and size is not None and size <= STREAM_COPY_MAX
+
+
+@traced("blob.stream_copy", kind="storage", measure=lambda result: result)
+def _stream_copy(source_client, dest_client, result):
+    downloader = source_client.get_blob_client(result.blob_name).download_blob()
+    data = downloader.readall()
+    response = dest_client.get_blob_client(result.new_blob_name).upload_blob(data, overwrite=True)
+    result.method = "stream"
+    result.size = len(data)
+    result.etag = response.get("etag")
+    result.last_modified = response.get("last_modified")
+    return result.size
+
+
+@traced("blob.start_copy", kind="storage")
+def _start_copy(source_client, dest_client, result):
+    try:
+        if _should_stream(source_client, dest_client, result.size):
+            _stream_copy(source_client, dest_client, result)
+            return "success"
+        source_blob = source_client.get_blob_client(result.blob_name)
+        dest_blob = dest_client.get_blob_client(result.new_blob_name)
+        copy = dest_blob.start_copy_from_url(source_blob.url)
+    except Exception as exc:
+        result.error = str(exc)
+        return None
+    # Same-account copies usually complete within this call, so check before polling.
+    status = copy.get("copy_status")
+    result.copy_id = copy.get("copy_id")
+    if status == "success":
+        result.method = "sync_copy"
+        result.etag = copy.get("etag")
+        result.last_modified = copy.get("last_modified")
+    return status
+
+
+@traced("blob.copy_poll", kind="storage")
+def _check_copy(dest_client, result):
+    try:
+        props = dest_client.get_blob_client(result.new_blob_name).get_blob_properties()
+    except Exception as exc:
+        result.error = str(exc)
+        return "failed"
+    status = props.copy.status
+    if status == "success":
+        result.method = "async_copy"
+        result.size = props.size
+        result.etag = props.etag
+        result.last_modified = props.last_modified
+    elif status in ("failed", "aborted"):
+        result.error = f"copy {status}: {props.copy.status_description}"
+    return status
+
+
+def _abort_copy(dest_client, result):
+    dest_blob = dest_client.get_blob_client(result.new_blob_name)
+    try:
+        if result.copy_id:
+            dest_blob.abort_copy(result.copy_id)
+        # An aborted copy leaves an empty destination blob behind.
+        dest_blob.delete_blob()
+    except Exception:
+        pass
+
+
+@traced("blob.delete_batch", kind="storage")
+def _delete_sources(source_client, results):
+    names = [result.blob_name for result in results]
+    try:
+        responses = list(source_client.delete_blobs(*names, raise_on_any_failure=False))
+    except Exception:
+        # Storage emulators and some account types reject batch requests; fall back to single deletes.
+        responses = None
+    for position, result in enumerate(results):
+        if responses is not None:
+            status_code = responses[position].status_code
+            if status_code in (200, 202, 404):
+                result.ok = True
+            else:
+                result.error = f"source delete failed with HTTP {status_code}"
+            continue
+        try:
+            source_client.get_blob_client(result.blob_name).delete_blob()
+            result.ok = True
+        except Exception as exc:
+            result.error = f"source delete failed: {exc}"
+
+
+def move_blobs(source_client, dest_client, moves, max_workers=MAX_WORKERS, timeout=COPY_TIMEOUT,
+               progress=None, sizes=None, duplicates=None):
+    # sizes maps source blob names to known sizes, which lets small cross-account moves be streamed.
+    # duplicates maps source blob names to the manifest entry of a destination blob that already
+    # holds the same content; those sources are deleted without copying.
+    results = [MoveResult(blob_name, new_blob_name) for blob_name, new_blob_name in moves]
+    total = len(results)
+    finished = 0
+    if sizes:
+        for result in results:
+            result.size = sizes.get(result.blob_name)
+    deduplicated = []
+    for result in results:
+        entry = (duplicates or {}).get(result.blob_name)
+        if entry is not None:
+            result.method = "deduplicated"
+            result.size = entry.get("size")
+            result.etag = entry.get("etag")
+            result.last_modified = entry.get("last_modified")
+            deduplicated.append(result)
+    to_copy = [result for result in results if result.method != "deduplicated"]
+
+    def report(result):
+        nonlocal finished
+        finished += 1
+        if result.ok:
+            move_latency.observe(result.method, time.monotonic() - result.started_at)
+        if progress is not None:
+            progress(finished, total, result)
+
+    def finish(copied):
+        batches = [copied[i:i + DELETE_BATCH_SIZE] for i in range(0, len(copied), DELETE_BATCH_SIZE)]
+        futures = [executor.submit(_delete_sources, source_client, batch) for batch in batches]
+        for batch, future in zip(batches, futures):
+            future.result()
+            for result in batch:
+                report(result)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        statuses = list(executor.map(lambda result: _start_copy(source_client, dest_client, result), to_copy))
+        pending = []
+        copied = list(deduplicated)
+        for result, status in zip(to_copy, statuses):
+            if result.error:
+                report(result)
+            elif status == "success":
+                copied.append(result)
+            elif status in ("failed", "aborted"):
+                result.error = f"copy {status}"
+                report(result)
+            else:
+                pending.append(result)
+        # Completed copies are finished straight away rather than waiting on the slow ones.
+        finish(copied)
+        copied = []
+
+        # Copies that didn't finish synchronously are polled together, backing off up to POLL_MAX.
+        delay = POLL_INITIAL
+        deadline = time.monotonic() + timeout
+        while pending:
+            if time.monotonic() + delay > deadline:
+                for result in pending:
+                    _abort_copy(dest_client, result)
+                    result.error = f"copy did not finish within {timeout}s"
+                    report(result)
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, POLL_MAX)
+            statuses = list(executor.map(lambda result: _check_copy(dest_client, result), pending))
+            still_pending = []
+            for result, status in zip(pending, statuses):
+                if status == "success":
+                    copied.append(result)
+                elif status in ("failed", "aborted"):
+                    report(result)
+                else:
+                    still_pending.append(result)
+            pending = still_pending
+        finish(copied)
+
+    return results
+
+
+def _exists(client, blob_name):
+    try:
+        client.get_blob_client(blob_name).get_blob_properties()
+    except Exception as exc:
+        if getattr(exc, "status_code", None) == 404:
+            return False
+        raise
+    return True
+
+
+def recover_moved(source_client, dest_client, results):
+    # A retried move whose source is gone but whose destination exists already finished on an
+    # earlier attempt; mark it done instead of reporting a failed copy. Returns the recovered results.
+    recovered = []
+    for result in results:
+        if result.ok:
+            continue
+        try:
+            if _exists(source_client, result.blob_name):
+                continue
+            props = dest_client.get_blob_client(result.new_blob_name).get_blob_properties()
+        except Exception:
+            continue
+        result.ok = True
+        result.error = None
+        result.method = "already_moved"
+        result.size = props.size
+        result.etag = props.etag
+        result.last_modified = props.last_modified
+        recovered.append(result)
+    return recovered
+
+
+def move_blob(source_client, dest_client, blob_name, new_blob_name, timeout=COPY_TIMEOUT):
+    result = move_blobs(source_client, dest_client, [(blob_name, new_blob_name)], max_workers=1,
+                        timeout=timeout)[0]
+    if not result.ok:
+        raise MoveError(f"Moving {blob_name} failed: {result.error}")
+    return result
@@ -0,0 +1,172 @@
+import base64
+import hashlib
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import traced
+
+# Small enough that a dropped connection loses little work, large enough to keep request overhead low.
+BLOCK_SIZE = 1024 * 1024
+MAX_CONCURRENCY = 4
+
+# SHA-256 of the content, kept in blob metadata (and the files manifest) so an unchanged re-upload can be skipped.
+HASH_METADATA_KEY = "sha256"
+
+upload_metrics = {"uploads": 0, "bytes": 0, "seconds": 0.0, "blocks_staged": 0, "blocks_resumed": 0,
+                  "deduplicated": 0, "bytes_saved": 0}
+_metrics_lock = threading.Lock()
+
+
+class UploadResult:
+    def __init__(self, size, content_md5, etag, last_modified, blocks_staged, blocks_resumed, seconds,
+                 sha256=None, deduplicated=False):
+        self.size = size
+        self.content_md5 = content_md5
+        self.sha256 = sha256
+        # True when the blob already held this content and nothing was sent.
+        self.deduplicated = deduplicated
+        self.etag = etag
+        self.last_modified = last_modified
+        self.blocks_staged = blocks_staged
+        self.blocks_resumed = blocks_resumed
+        self.seconds = seconds
+
+    @property
+    def throughput(self):
+        return self.size / self.seconds if self.seconds else 0.0
+
+
+def _read_blocks(file, block_size):
+    file.seek(0)
+    while True:
+        data = file.read(block_size)
+        if not data:
+            return
+        yield data
+
+
+def _block_id(fingerprint, index):
+    # Block ids are derived from the file's MD5, so re-uploading the same file finds its own
+    # uncommitted blocks and skips them. All ids for a blob must have the same length.
+    return base64.b64encode(f"{fingerprint}-{index:06d}".encode()).decode()
+
+
+def _uncommitted_block_ids(blob_client):
+    from azure.core.exceptions import ResourceNotFoundError
+
+    try:
+        _, uncommitted = blob_client.get_block_list(block_list_type="uncommitted")
+    except ResourceNotFoundError:
+        return set()
+    return {block.id for block in uncommitted}
+
+
+def _stored_properties(blob_client):
+    # The manifest can be stale (the blob deleted or moved outside the portal), so a skip is
+    # confirmed against the blob itself. Returns None if it no longer exists.
+    try:
+        return blob_client.get_blob_properties()
+    except Exception as exc:
+        if getattr(exc, "status_code", None) == 404:
+            return None
+        raise
+
+
+def _record(result):
+    with _metrics_lock:
+        if result.deduplicated:
+            upload_metrics["deduplicated"] += 1
+            upload_metrics["bytes_saved"] += result.size
+            return
+        upload_metrics["uploads"] += 1
+        upload_metrics["bytes"] += result.size
+        upload_metrics["seconds"] += result.seconds
+        upload_metrics["blocks_staged"] += result.blocks_staged
+        upload_metrics["blocks_resumed"] += result.blocks_resumed
+
+
+@traced("blob.upload", kind="storage", measure=lambda result: result.size)
+def upload_in_blocks(blob_client, file, block_size=BLOCK_SIZE, max_concurrency=MAX_CONCURRENCY,
+                     content_type=None, progress=None, existing=None):
+    # existing is the manifest entry of the blob being replaced, if any; when its sha256 matches
+    # the file's and the stored blob still carries that hash, the upload is skipped and the
+    # stored blob's etag is returned.
+    started = time.perf_counter()
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    size = 0
+    for data in _read_blocks(file, block_size):
+        md5.update(data)
+        sha256.update(data)
+        size += len(data)
+    content_md5 = md5.digest()
+    content_sha256 = sha256.hexdigest()
+    stored = _stored_properties(blob_client) if existing and existing.get("sha256") == content_sha256 else None
+    if stored is not None and (stored.metadata or {}).get(HASH_METADATA_KEY) == content_sha256:
+        result = UploadResult(size, content_md5, stored.etag, stored.last_modified,
+                              0, 0, time.perf_counter() - started, sha256=content_sha256, deduplicated=True)
+        _record(result)
+        return result
+    # Imported here rather than at module level, so importing the portal doesn't load the
+    # Azure SDK until the first upload.
+    from azure.storage.blob import BlobBlock, ContentSettings
+
+    content_settings = ContentSettings(content_type=content_type, content_md5=bytearray(content_md5))
+    metadata = {HASH_METADATA_KEY: content_sha256}
+
+    if size <= block_size:
+        # Small files go up in one request; validate_content makes the service check the MD5.
+        file.seek(0)
+        response = blob_client.upload_blob(file.read(), overwrite=True, validate_content=True,
+                                           content_settings=content_settings, metadata=metadata)
+        result = UploadResult(size, content_md5, response.get("etag"), response.get("last_modified"),
+                              1, 0, time.perf_counter() - started, sha256=content_sha256)
+        _record(result)
+        return result
+
+    fingerprint = md5.hexdigest()
+    already_staged = _uncommitted_block_ids(blob_client)
+    block_ids = []
+    staged = 0
+    resumed = 0
+    total_blocks = -(-size // block_size)
+    done = 0
+    # Blocks are read on this thread and staged on the pool, with at most
+    # 2 x max_concurrency blocks held in memory at a time.
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for index, data in enumerate(_read_blocks(file, block_size)):
+            block_id = _block_id(fingerprint, index)
+            block_ids.append(block_id)
+            if block_id in already_staged:
+                resumed += 1
+                done += 1
+                continue
+            while len(in_flight) >= 2 * max_concurrency:
+                in_flight.popleft().result()
+                done += 1
+                if progress is not None:
+                    progress(done, total_blocks)
+            in_flight.append(executor.submit(blob_client.stage_block, block_id, data, validate_content=True))
+            staged += 1
+        while in_flight:
+            in_flight.popleft().result()
+            done += 1
+            if progress is not None:
+                progress(done, total_blocks)
+
+    response = blob_client.commit_block_list([BlobBlock(block_id=block_id) for block_id in block_ids],
+                                             content_settings=content_settings, metadata=metadata)
+    result = UploadResult(size, content_md5, response.get("etag"), response.get("last_modified"),
+                          staged, resumed, time.perf_counter() - started, sha256=content_sha256)
+    _record(result)
+    return result
+
+
+def throughput_summary():
+    with _metrics_lock:
+        metrics = dict(upload_metrics)
+    metrics["mb_per_second"] = metrics["bytes"] / metrics["seconds"] / 1024 ** 2 if metrics["seconds"] else 0.0
+    return metrics
@@ -0,0 +1,199 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from auth import hash_password
+from tracing import traced
+
+USER_COLUMNS = ("email", "password", "role", "name", "roll_number")
+REQUIRED_USER_COLUMNS = ("email", "password", "role", "name")
+# A department row may list directories to create under it, separated by ";" (e.g. "2024;2025").
+DEPARTMENT_COLUMNS = ("name", "directories")
+REQUIRED_DEPARTMENT_COLUMNS = ("name",)
+USER_INSERT_SQL = "INSERT INTO users (email, password, role, name, roll_number) VALUES (%s, %s, %s, %s, %s)"
+DEPARTMENT_INSERT_SQL = "INSERT INTO departments (name) VALUES (%s)"
+CHUNK_SIZE = 500
+# PBKDF2 releases the GIL, so a chunk's passwords are hashed on several cores at once.
+HASH_WORKERS = min(8, os.cpu_count() or 1)
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+DUPLICATE = "duplicate"
+ERROR = "error"
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def _cell(value):
+    # Spreadsheet cells come back as numbers or None; roll numbers typed as 1234 read as 1234.0.
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _header(columns, required):
+    header = [_cell(column).lower() for column in columns]
+    missing = [column for column in required if column not in header]
+    if missing:
+        raise ImportFormatError(f"Missing column(s): {', '.join(missing)}")
+    return header
+
+
+def read_chunks(file, file_name, required, chunk_size=CHUNK_SIZE):
+    # Yields lists of (row number, {column: text}) without loading the whole file; row numbers
+    # match what a spreadsheet shows (the header is row 1).
+    if file_name.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = _header(next(rows, ()), required)
+            chunk = []
+            for row_number, values in enumerate(rows, start=2):
+                if all(_cell(value) == "" for value in values):
+                    continue
+                chunk.append((row_number, dict(zip(header, map(_cell, values)))))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        finally:
+            workbook.close()
+    elif file_name.lower().endswith(".csv"):
+        import pandas as pd
+
+        for frame in pd.read_csv(file, dtype=str, keep_default_na=False, skip_blank_lines=True, chunksize=chunk_size):
+            header = _header(frame.columns, required)
+            yield [(int(index) + 2, dict(zip(header, map(_cell, values))))
+                   for index, values in zip(frame.index, frame.itertuples(index=False, name=None))]
+    else:
+        raise ImportFormatError("Upload a .csv or .xlsx file.")
+
+
+def _report():
+    return {"rows": 0, "inserted": 0, "duplicates": 0, "errors": 0, "issues": [], "directories": []}
+
+
+def _flag(report, row_number, value, status, message):
+    report["duplicates" if status == DUPLICATE else "errors"] += 1
+    report["issues"].append({"row": row_number, "value": value, "status": status, "message": message})
+
+
+def _existing(connection, sql, values):
+    # Returns the matches casefolded: MySQL's default collation compares case-insensitively, so
+    # "A@x.com" and "a@x.com" are the same key to the unique index.
+    if not values:
+        return set()
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(", ".join(["%s"] * len(values))), list(values))
+        return {next(iter(row.values())).casefold() for row in cursor.fetchall()}
+
+
+def _write(connection, report, sql, rows):
+    # One transaction per chunk: a failure rolls back only the chunk being written, and its rows
+    # are reported as errors rather than ending the import. rows are (row number, value, params).
+    try:
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [params for _, _, params in rows])
+        connection.commit()
+    except Exception as exc:
+        connection.rollback()
+        for row_number, value, _ in rows:
+            _flag(report, row_number, value, ERROR, f"Not saved, the database rejected this chunk: {exc}")
+        return 0
+    return len(rows)
+
+
+@traced("bulk_import.users", kind="db")
+def import_users(connect, chunks, roles, progress=None):
+    # chunks come from read_chunks. Rows with a problem, or whose email is already in the file or
+    # the users table, are reported and skipped; the rest are inserted with hashed passwords.
+    # connect() yields a connection (a pool checkout) held only while a chunk is checked and
+    # written, so hashing and progress (which may redraw the page) run with none checked out.
+    report = _report()
+    seen = set()
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+        for chunk in chunks:
+            report["rows"] += len(chunk)
+            valid = []
+            for row_number, record in chunk:
+                email = record["email"] = record.get("email", "").strip().lower()
+                missing = [column for column in REQUIRED_USER_COLUMNS if not record.get(column)]
+                if missing:
+                    _flag(report, row_number, email, ERROR, f"Missing {', '.join(missing)}")
+                elif not EMAIL_PATTERN.match(email):
+                    _flag(report, row_number, email, ERROR, "Invalid email address")
+                elif record["role"] not in roles:
+                    _flag(report, row_number, email, ERROR, f"Unknown role '{record['role']}'")
+                elif email in seen:
+                    _flag(report, row_number, email, DUPLICATE, "Repeated earlier in the file")
+                else:
+                    seen.add(email)
+                    valid.append((row_number, record))
+
+            with connect() as connection:
+                existing = _existing(connection, "SELECT email FROM users WHERE email IN ({})",
+                                     [record["email"] for _, record in valid])
+            new = []
+            for row_number, record in valid:
+                if record["email"] in existing:
+                    _flag(report, row_number, record["email"], DUPLICATE, "User already exists")
+                else:
+                    new.append((row_number, record))
+            hashes = pool.map(hash_password, [record["password"] for _, record in new])
+            rows = [(row_number, record["email"], (record["email"], password_hash, record["role"], record["name"],
+                                                   record.get("roll_number") or None))
+                    for (row_number, record), password_hash in zip(new, hashes)]
+            if rows:
+                with connect() as connection:
+                    report["inserted"] += _write(connection, report, USER_INSERT_SQL, rows)
+            if progress is not None:
+                progress(report)
+    return report
+
+
+@traced("bulk_import.departments", kind="db")
+def import_departments(connect, chunks, progress=None):
+    # Like import_users. report["directories"] lists the "department/directory" paths the
+    # inserted rows asked for; the caller creates their placeholders.
+    report = _report()
+    seen = set()
+    for chunk in chunks:
+        report["rows"] += len(chunk)
+        valid = []
+        for row_number, record in chunk:
+            name = record.get("name", "")
+            if not name:
+                _flag(report, row_number, name, ERROR, "Missing name")
+            elif "/" in name:
+                _flag(report, row_number, name, ERROR, "Department names cannot contain '/'")
+            elif name.casefold() in seen:
+                _flag(report, row_number, name, DUPLICATE, "Repeated earlier in the file")
+            else:
+                seen.add(name.casefold())
+                valid.append((row_number, record))
+
+        rows = []
+        directories = []
+        with connect() as connection:
+            existing = _existing(connection, "SELECT name FROM departments WHERE name IN ({})",
+                                 [record["name"] for _, record in valid])
+            for row_number, record in valid:
+                if record["name"].casefold() in existing:
+                    _flag(report, row_number, record["name"], DUPLICATE, "Department already exists")
+                    continue
+                rows.append((row_number, record["name"], (record["name"],)))
+                for directory in record.get("directories", "").split(";"):
+                    if directory.strip():
+                        directories.append(f"{record['name']}/{directory.strip().strip('/')}")
+            if rows and _write(connection, report, DEPARTMENT_INSERT_SQL, rows):
+                report["inserted"] += len(rows)
+                report["directories"].extend(directories)
+        if progress is not None:
+            progress(report)
+    return report
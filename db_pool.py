@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection:
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+def default_health_check(connection):
+    # pymysql connections expose ping(); anything else gets a trivial query.
+    if hasattr(connection, "ping"):
+        connection.ping(reconnect=False)
+    else:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        finally:
+            cursor.close()
+
+
+class ConnectionPool:
+    def __init__(self, connect, max_size=10, max_idle=300, max_lifetime=3600,
+                 checkout_timeout=10, health_check=default_health_check, check_after=30):
+        self._connect = connect
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self._health_check = health_check
+        # Connections idle for less than this many seconds skip the health check.
+        self.check_after = check_after
+        self._idle = deque()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self.metrics = {
+            "checkouts": 0,
+            "reused": 0,
+            "handshakes": 0,
+            "evicted_idle": 0,
+            "evicted_lifetime": 0,
+            "failed_health_checks": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+        }
+
+    def _close(self, pooled):
+        try:
+            pooled.raw.close()
+        except Exception:
+            pass
+
+    def _expired(self, pooled, now):
+        if self.max_lifetime and now - pooled.created_at > self.max_lifetime:
+            self.metrics["evicted_lifetime"] += 1
+            return True
+        if self.max_idle and now - pooled.last_used > self.max_idle:
+            self.metrics["evicted_idle"] += 1
+            return True
+        return False
+
+    def _evict_expired_locked(self, now):
+        # Idle connections are returned to the right end, so the oldest sit on the left.
+        while self._idle and self._expired(self._idle[0], now):
+            self._close(self._idle.popleft())
+            self._size -= 1
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._lock:
+            self.metrics["checkouts"] += 1
+            waited = False
+            started = time.monotonic()
+            while True:
+                now = time.monotonic()
+                self._evict_expired_locked(now)
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    pooled = None
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    self.metrics["timeouts"] += 1
+                    raise PoolTimeout(f"No database connection available after {self.checkout_timeout}s")
+                if not waited:
+                    waited = True
+                    self.metrics["waits"] += 1
+                self._available.wait(remaining)
+            if waited:
+                self.metrics["wait_seconds"] += time.monotonic() - started
+
+        if pooled is not None:
+            if time.monotonic() - pooled.last_used < self.check_after:
+                self._count("reused")
+                return pooled
+            try:
+                self._health_check(pooled.raw)
+                self._count("reused")
+                return pooled
+            except Exception:
+                self._count("failed_health_checks")
+                self._close(pooled)
+
+        try:
+            raw = self._connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._available.notify()
+            raise
+        self._count("handshakes")
+        return PooledConnection(raw)
+
+    def _release(self, pooled, discard=False):
+        with self._lock:
+            if discard:
+                self._close(pooled)
+                self._size -= 1
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+            self._available.notify()
+
+    def _count(self, key):
+        with self._lock:
+            self.metrics[key] += 1
+
+    @contextmanager
+    def connection(self):
+        pooled = self._acquire()
+        try:
+            yield pooled.raw
+        finally:
+            # However the block ended (including BaseExceptions such as Streamlit's rerun and stop),
+            # the connection goes back rolled back, or is discarded if that fails. Without
+            # autocommit a borrower that only read still has a transaction open, and under
+            # REPEATABLE READ the next borrower would keep reading its snapshot. Anything meant to
+            # be kept has been committed by now.
+            try:
+                pooled.raw.rollback()
+            except Exception:
+                self._release(pooled, discard=True)
+            else:
+                self._release(pooled)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.metrics)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+        stats["handshakes_avoided"] = stats["checkouts"] - stats["handshakes"]
+        return stats
+
+    def close(self):
+        with self._lock:
+            while self._idle:
+                self._close(self._idle.pop())
+                self._size -= 1
@@ -0,0 +1,194 @@
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from blob_upload import upload_in_blocks
+from tracing import traced
+from zip_builder import build_zip, zip_info
+
+PER_ROLL = "per_roll"
+COMBINED = "combined"
+MAX_WORKERS = 8
+# Each download is buffered in memory up to this size (on disk beyond it) until the writer takes it.
+SPOOL_LIMIT = 4 * 1024 * 1024
+# Every this many files the combined archive is closed, and its central directory is copied to a
+# side file. Later files are written over that directory, so a restarted export truncates the
+# archive to where the directory started, puts the saved copy back, and appends from there.
+CHECKPOINT_FILES = 100
+COPY_CHUNK = 1024 * 1024
+
+
+def _roll_groups(entries):
+    groups = {}
+    for blob_name in sorted(entries):
+        roll_number = blob_name.split("/")[2] if blob_name.count("/") >= 3 else ""
+        groups.setdefault(roll_number, []).append(blob_name)
+    return groups
+
+
+def _fetch(container_client, blob_name):
+    downloader = container_client.get_blob_client(blob_name).download_blob()
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_LIMIT)
+    size = 0
+    for chunk in downloader.chunks():
+        spool.write(chunk)
+        size += len(chunk)
+    spool.seek(0)
+    return spool, size, getattr(downloader.properties, "last_modified", None)
+
+
+def _export_per_roll(container_client, entries, output_dir, state, checkpoint, progress, max_workers):
+    # One archive per roll number, built in parallel. An archive is written to a .part file and
+    # renamed when complete, so a restart redoes at most the archives that were in progress.
+    groups = _roll_groups(entries)
+    done = set(state.setdefault("archives_done", []))
+    files_done = sum(len(groups.get(roll_number, ())) for roll_number in done)
+    total = len(entries)
+
+    def build(roll_number):
+        path = os.path.join(output_dir, f"{roll_number or 'files'}.zip")
+        with open(f"{path}.part", "wb") as handle:
+            build_zip(container_client, groups[roll_number], fileobj=handle, entries=entries)
+        os.replace(f"{path}.part", path)
+        return os.path.getsize(path)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(build, roll_number): roll_number
+                   for roll_number in groups if roll_number not in done}
+        for future in as_completed(futures):
+            roll_number = futures[future]
+            future.result()
+            done.add(roll_number)
+            files_done += len(groups[roll_number])
+            state["archives_done"] = sorted(done)
+            state["bytes"] = state.get("bytes", 0) + sum(entries[blob_name].get("size") or 0
+                                                         for blob_name in groups[roll_number])
+            checkpoint()
+            if progress is not None:
+                progress(files_done, total)
+    return [os.path.join(output_dir, f"{roll_number or 'files'}.zip") for roll_number in sorted(groups)]
+
+
+def _save_directory(part_path, offset, directory_path):
+    with open(part_path, "rb") as handle, open(f"{directory_path}.tmp", "wb") as saved:
+        handle.seek(offset)
+        shutil.copyfileobj(handle, saved, COPY_CHUNK)
+    os.replace(f"{directory_path}.tmp", directory_path)
+
+
+def _export_combined(container_client, entries, path, state, checkpoint, progress, max_workers):
+    # One archive for the whole directory. Blobs download in parallel, up to 2 x max_workers ahead
+    # of the writer, and are added in name order.
+    blob_names = sorted(entries)
+    if state.get("written") == len(blob_names) and os.path.exists(path):
+        return [path]
+    part_path = f"{path}.part"
+    directory_path = f"{path}.directory"
+    written = state.get("written", 0)
+    offset = state.get("offset")
+    if (written and offset is not None and os.path.exists(part_path) and os.path.exists(directory_path)
+            and os.path.getsize(part_path) >= offset):
+        with open(directory_path, "rb") as saved, open(part_path, "r+b") as handle:
+            handle.truncate(offset)
+            handle.seek(offset)
+            shutil.copyfileobj(saved, handle, COPY_CHUNK)
+        mode = "a"
+    else:
+        written = 0
+        mode = "w"
+    # Counted locally and saved with each checkpoint, so files re-added after a restart count once.
+    written_bytes = state.get("bytes", 0) if written else 0
+    total = len(blob_names)
+    remaining = iter(blob_names[written:])
+    in_flight = deque()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def fill():
+            while len(in_flight) < 2 * max_workers:
+                blob_name = next(remaining, None)
+                if blob_name is None:
+                    return
+                in_flight.append((blob_name, executor.submit(_fetch, container_client, blob_name)))
+
+        fill()
+        archive = zipfile.ZipFile(part_path, mode, allowZip64=True)
+        try:
+            while in_flight:
+                blob_name, future = in_flight.popleft()
+                spool, size, last_modified = future.result()
+                with spool, archive.open(zip_info(blob_name, last_modified), "w", force_zip64=True) as zip_entry:
+                    shutil.copyfileobj(spool, zip_entry, COPY_CHUNK)
+                written += 1
+                written_bytes += size
+                fill()
+                if written % CHECKPOINT_FILES == 0 or not in_flight:
+                    archive.close()
+                    # start_dir is where close() wrote the central directory.
+                    _save_directory(part_path, archive.start_dir, directory_path)
+                    state["written"] = written
+                    state["bytes"] = written_bytes
+                    state["offset"] = archive.start_dir
+                    checkpoint()
+                    if in_flight:
+                        archive = zipfile.ZipFile(part_path, "a", allowZip64=True)
+                if progress is not None:
+                    progress(written, total)
+            # Already closed, unless there was nothing left to add (an empty directory, or a restart
+            # right after the final checkpoint).
+        except BaseException:
+            # Left open, the archive would write its central directory whenever it is garbage
+            # collected, possibly over a resumed attempt; the next attempt truncates this anyway.
+            archive.close()
+            raise
+        archive.close()
+    os.replace(part_path, path)
+    if os.path.exists(directory_path):
+        os.remove(directory_path)
+    return [path]
+
+
+@traced("export.directory", kind="storage", measure=lambda stats: stats["bytes"])
+def export_directory(container_client, entries, output_dir, layout=PER_ROLL, name="export", state=None,
+                     checkpoint=None, progress=None, max_workers=MAX_WORKERS):
+    # entries are the directory's manifest entries ({blob name: {size, etag, last_modified}}).
+    # state is a dict persisted by checkpoint() (e.g. a job's state); passing back the state of an
+    # interrupted export resumes it. Returns {"archives", "files", "bytes", "seconds"}.
+    state = state if state is not None else {}
+    checkpoint = checkpoint or (lambda: None)
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    if layout == PER_ROLL:
+        archives = _export_per_roll(container_client, entries, output_dir, state, checkpoint, progress, max_workers)
+    elif layout == COMBINED:
+        archives = _export_combined(container_client, entries, os.path.join(output_dir, f"{name}.zip"), state,
+                                    checkpoint, progress, max_workers)
+    else:
+        raise ValueError(f"Unknown export layout: {layout}")
+    state["seconds"] = state.get("seconds", 0.0) + time.perf_counter() - started
+    checkpoint()
+    return {"archives": archives, "files": len(entries), "bytes": state.get("bytes", 0), "seconds": state["seconds"]}
+
+
+@traced("export.upload", kind="storage")
+def upload_archives(container_client, paths, prefix, state=None, checkpoint=None):
+    # Copies finished archives to export blobs under prefix/, skipping ones an earlier attempt
+    # uploaded; an upload cut off part-way resumes from its staged blocks. Returns the blob names.
+    state = state if state is not None else {}
+    uploaded = set(state.setdefault("uploaded", []))
+    blob_names = []
+    for path in paths:
+        blob_name = f"{prefix}/{os.path.basename(path)}"
+        blob_names.append(blob_name)
+        if blob_name in uploaded:
+            continue
+        with open(path, "rb") as handle:
+            upload_in_blocks(container_client.get_blob_client(blob_name), handle, content_type="application/zip")
+        uploaded.add(blob_name)
+        state["uploaded"] = sorted(uploaded)
+        if checkpoint is not None:
+            checkpoint()
+    return blob_names
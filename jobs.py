@@ -0,0 +1,251 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from tracing import traced
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 2.0
+# A running job whose lease has not been renewed for this long is assumed dead (e.g. the
+# process restarted) and is handed to another worker. A worker renews the lease every
+# HEARTBEAT_SECONDS while the handler runs, however long a single step takes.
+LEASE_SECONDS = 300
+HEARTBEAT_SECONDS = 60
+POLL_INTERVAL = 0.5
+# Progress writes from one job are throttled to one per this many seconds.
+PROGRESS_INTERVAL = 0.5
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, group_id TEXT NOT NULL, "
+    "kind TEXT NOT NULL, payload TEXT NOT NULL, dedupe_key TEXT, status TEXT NOT NULL, "
+    "attempts INTEGER NOT NULL DEFAULT 0, run_after REAL NOT NULL, lease_until REAL, "
+    "done INTEGER NOT NULL DEFAULT 0, total INTEGER NOT NULL DEFAULT 0, state TEXT, result TEXT, error TEXT, "
+    "created_at REAL NOT NULL, updated_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, run_after)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_group ON jobs (group_id)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs (dedupe_key, status)",
+    # Jobs of other groups that a submission matched instead of inserting a duplicate.
+    "CREATE TABLE IF NOT EXISTS job_links (group_id TEXT NOT NULL, job_id INTEGER NOT NULL, "
+    "PRIMARY KEY (group_id, job_id))",
+]
+
+
+class Job:
+    # Handed to a handler. state survives retries, so a handler can skip work it already did.
+    def __init__(self, queue, row):
+        self.id = row["id"]
+        self.group_id = row["group_id"]
+        self.kind = row["kind"]
+        self.payload = json.loads(row["payload"])
+        self.state = json.loads(row["state"]) if row["state"] else {}
+        self.attempts = row["attempts"]
+        self._queue = queue
+        self._reported_at = 0.0
+
+    def progress(self, done, total, force=False):
+        now = time.monotonic()
+        if force or done >= total or now - self._reported_at >= PROGRESS_INTERVAL:
+            self._reported_at = now
+            self._queue._update(self.id, done=done, total=total, lease_until=time.time() + LEASE_SECONDS)
+
+    def save_state(self):
+        self._queue._update(self.id, state=json.dumps(self.state), lease_until=time.time() + LEASE_SECONDS)
+
+
+class JobQueue:
+    # A persistent queue in a local SQLite file, worked by a pool of threads. Jobs outlive the
+    # Streamlit script run (and the process) that submitted them; pages only submit and poll.
+    def __init__(self, path, handlers, workers=4, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.handlers = handlers
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._threads = []
+        with self._connect() as connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return _Transaction(connection)
+
+    def submit(self, kind, payloads, group_id=None):
+        # Submits one job per payload under a shared group id. A payload that is still queued or
+        # running (a double click, a rerun) isn't inserted again; the existing job is linked to
+        # this group instead, so the group tracks it alongside its own.
+        group_id = group_id or uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as connection:
+            for payload in payloads:
+                encoded = json.dumps(payload, sort_keys=True)
+                dedupe_key = hashlib.sha256(f"{kind}\0{encoded}".encode()).hexdigest()
+                existing = connection.execute(
+                    "SELECT id, group_id FROM jobs WHERE dedupe_key=? AND status IN (?, ?) LIMIT 1",
+                    (dedupe_key, QUEUED, RUNNING)).fetchone()
+                if existing is not None:
+                    if existing["group_id"] != group_id:
+                        connection.execute("INSERT OR IGNORE INTO job_links (group_id, job_id) VALUES (?, ?)",
+                                           (group_id, existing["id"]))
+                    continue
+                connection.execute(
+                    "INSERT INTO jobs (group_id, kind, payload, dedupe_key, status, run_after, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (group_id, kind, encoded, dedupe_key, QUEUED, now, now, now))
+        return group_id
+
+    def group(self, group_id):
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT * FROM jobs WHERE group_id=? OR id IN (SELECT job_id FROM job_links WHERE group_id=?) "
+                "ORDER BY id", (group_id, group_id)).fetchall()
+        jobs = [_describe(row) for row in rows]
+        statuses = {job["status"] for job in jobs}
+        return {
+            "jobs": jobs,
+            "done": sum(job["done"] for job in jobs),
+            "total": sum(job["total"] for job in jobs),
+            "finished": bool(jobs) and statuses <= {SUCCEEDED, FAILED},
+            "failed": FAILED in statuses,
+        }
+
+    def recent(self, limit=50):
+        with self._connect() as connection:
+            rows = connection.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [_describe(row) for row in rows]
+
+    def retry(self, group_id):
+        # Requeues the group's failed jobs, including linked ones: they run a payload this group
+        # submitted too.
+        with self._connect() as connection:
+            connection.execute("UPDATE jobs SET status=?, attempts=0, run_after=?, error=NULL, updated_at=? "
+                               "WHERE (group_id=? OR id IN (SELECT job_id FROM job_links WHERE group_id=?)) "
+                               "AND status=?", (QUEUED, time.time(), time.time(), group_id, group_id, FAILED))
+
+    def _update(self, job_id, **columns):
+        columns["updated_at"] = time.time()
+        assignments = ", ".join(f"{column}=?" for column in columns)
+        with self._connect() as connection:
+            connection.execute(f"UPDATE jobs SET {assignments} WHERE id=?", (*columns.values(), job_id))
+
+    def _claim(self):
+        now = time.time()
+        with self._connect() as connection:
+            while True:
+                row = connection.execute(
+                    "SELECT * FROM jobs WHERE (status=? AND run_after<=?) OR (status=? AND lease_until<?) "
+                    "ORDER BY id LIMIT 1", (QUEUED, now, RUNNING, now)).fetchone()
+                if row is None:
+                    return None
+                if row["status"] == QUEUED or row["attempts"] < self.max_attempts:
+                    break
+                # Its worker died on every attempt (e.g. the job crashes the process); stop reclaiming it.
+                connection.execute("UPDATE jobs SET status=?, error=?, updated_at=? WHERE id=?",
+                                   (FAILED, f"Worker stopped during each of {row['attempts']} attempts", now,
+                                    row["id"]))
+            connection.execute("UPDATE jobs SET status=?, attempts=attempts+1, lease_until=?, updated_at=? WHERE id=?",
+                               (RUNNING, now + LEASE_SECONDS, now, row["id"]))
+            row = connection.execute("SELECT * FROM jobs WHERE id=?", (row["id"],)).fetchone()
+        return Job(self, row)
+
+    def _heartbeat(self, job, stop):
+        while not stop.wait(HEARTBEAT_SECONDS):
+            self._update(job.id, lease_until=time.time() + LEASE_SECONDS)
+
+    def _run(self, job):
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, stop), name=f"job-heartbeat-{job.id}",
+                                     daemon=True)
+        heartbeat.start()
+        try:
+            result = traced(f"job.{job.kind}", kind="job")(self.handlers[job.kind])(job)
+        except Exception as exc:
+            error = exc
+        else:
+            error = None
+        finally:
+            stop.set()
+            heartbeat.join()
+        if error is None:
+            self._update(job.id, status=SUCCEEDED, error=None, result=json.dumps(result))
+            return
+        # A handler can report what it did get done by raising an exception with a result attribute.
+        result = getattr(error, "result", None)
+        result = json.dumps(result) if result is not None else None
+        if job.attempts < self.max_attempts:
+            self._update(job.id, status=QUEUED, error=str(error), result=result,
+                         run_after=time.time() + RETRY_BACKOFF ** job.attempts)
+        else:
+            self._update(job.id, status=FAILED, error=str(error), result=result)
+
+    def run_pending(self):
+        # Works the queue on the calling thread until it is empty; used by workers and benchmarks.
+        ran = 0
+        while not self._stop.is_set():
+            job = self._claim()
+            if job is None:
+                return ran
+            self._run(job)
+            ran += 1
+        return ran
+
+    def _work(self):
+        while not self._stop.is_set():
+            if not self.run_pending():
+                self._stop.wait(POLL_INTERVAL)
+
+    def start(self):
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stop.clear()
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes SQLite's write lock up front, so two workers (or two processes
+    # sharing the file) can never claim the same job.
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def _describe(row):
+    return {
+        "id": row["id"],
+        "group_id": row["group_id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "done": row["done"],
+        "total": row["total"],
+        "error": row["error"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "updated_at": row["updated_at"],
+    }
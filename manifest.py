@@ -0,0 +1,243 @@
+from datetime import timezone
+
+from blob_upload import HASH_METADATA_KEY
+from tracing import traced
+
+STATUS_ACTIVE = "active"
+STATUS_ARCHIVED = "archived"
+STATUS_REJECTED = "rejected"
+
+COLUMNS = ("container", "blob_name", "department", "directory", "roll_number", "file_name", "status", "size",
+           "etag", "uploaded_at", "sha256")
+INSERT_SQL = f"INSERT INTO files ({', '.join(COLUMNS)}) VALUES ({', '.join(['%s'] * len(COLUMNS))})"
+DELETE_SQL = "DELETE FROM files WHERE container=%s AND blob_name=%s"
+# A move keeps the row (and its uploaded_at); only where the file lives and its etag change.
+MOVE_SQL = ("UPDATE files SET container=%s, blob_name=%s, department=%s, directory=%s, roll_number=%s, "
+            "file_name=%s, status=%s, etag=%s WHERE container=%s AND blob_name=%s")
+# As in schema.sql; created on first start if schema.sql was never run.
+TABLE_SQL = ("CREATE TABLE IF NOT EXISTS files (id BIGINT AUTO_INCREMENT PRIMARY KEY, container VARCHAR(63) NOT NULL, "
+             "blob_name VARCHAR(512) NOT NULL, department VARCHAR(100), directory VARCHAR(255), "
+             "roll_number VARCHAR(50), file_name VARCHAR(255), status VARCHAR(20) NOT NULL, size BIGINT, "
+             "etag VARCHAR(64), uploaded_at DATETIME, sha256 CHAR(64), "
+             "UNIQUE KEY uq_files_blob (container, blob_name), "
+             "INDEX idx_files_browse (container, department, directory, roll_number), "
+             "INDEX idx_files_status (status))")
+WRITE_BATCH_SIZE = 500
+RECONCILE_PAGE_SIZE = 5000
+
+
+def split_blob_name(blob_name):
+    # "dept/dir/roll/file" -> (department, directory, roll_number, file_name); directory
+    # placeholders ("dept/dir/") have no roll number or file name.
+    parts = [part for part in blob_name.split("/") if part]
+    department = parts[0] if parts else None
+    directory = parts[1] if len(parts) > 1 else None
+    roll_number = parts[2] if len(parts) > 2 else None
+    file_name = "/".join(parts[3:]) or None
+    return department, directory, roll_number, file_name
+
+
+def _timestamp(value):
+    # Stored as naive UTC, which both MySQL DATETIME and the SQLite stand-in accept.
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _row(container, blob_name, status, entry):
+    return (container, blob_name, *split_blob_name(blob_name), status, entry.get("size"), entry.get("etag"),
+            _timestamp(entry.get("last_modified")), entry.get("sha256"))
+
+
+def _entry(row):
+    return {"size": row["size"], "etag": row["etag"], "last_modified": row["uploaded_at"], "sha256": row["sha256"]}
+
+
+def _like_prefix(prefix):
+    # "!" rather than a backslash, which MySQL and SQLite quote differently.
+    return prefix.replace("!", "!!").replace("%", "!%").replace("_", "!_") + "%"
+
+
+def ensure_table(connection):
+    # Creates the files table on first start (Admin > Reconcile File Manifest fills it), and adds
+    # the sha256 column to manifests created before uploads were hashed. Any other failure (a
+    # lost connection, say) propagates as itself.
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW TABLES LIKE 'files'")
+        if cursor.fetchone() is None:
+            cursor.execute(TABLE_SQL)
+        else:
+            cursor.execute("SHOW COLUMNS FROM files")
+            if "sha256" not in {row["Field"] for row in cursor.fetchall()}:
+                cursor.execute("ALTER TABLE files ADD COLUMN sha256 CHAR(64)")
+    connection.commit()
+
+
+def upsert_files(connection, container, status, entries, commit=True):
+    # entries are {blob name: {size, etag, last_modified}}; existing rows for those names are replaced.
+    rows = [_row(container, blob_name, status, entry) for blob_name, entry in entries.items()]
+    try:
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), WRITE_BATCH_SIZE):
+                batch = rows[start:start + WRITE_BATCH_SIZE]
+                cursor.executemany(DELETE_SQL, [(row[0], row[1]) for row in batch])
+                cursor.executemany(INSERT_SQL, batch)
+        if commit:
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return len(rows)
+
+
+def record_moves(connection, source_container, dest_container, status, results, commit=True):
+    # results are blob_moves.MoveResult objects; only successful moves are recorded.
+    moved = [result for result in results if result.ok]
+    try:
+        with connection.cursor() as cursor:
+            for start in range(0, len(moved), WRITE_BATCH_SIZE):
+                batch = moved[start:start + WRITE_BATCH_SIZE]
+                # A file moved to the archive again replaces the copy already recorded there.
+                cursor.executemany(DELETE_SQL, [(dest_container, result.new_blob_name) for result in batch])
+                cursor.executemany(MOVE_SQL, [
+                    (dest_container, result.new_blob_name, *split_blob_name(result.new_blob_name), status,
+                     result.etag, source_container, result.blob_name)
+                    for result in batch])
+        if commit:
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return len(moved)
+
+
+def directories(connection, container, department):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT DISTINCT directory FROM files WHERE container=%s AND department=%s "
+                       "AND directory IS NOT NULL ORDER BY directory", (container, department))
+        return [row["directory"] for row in cursor.fetchall()]
+
+
+def roll_numbers(connection, container, department, directory):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT DISTINCT roll_number FROM files WHERE container=%s AND department=%s "
+                       "AND directory=%s AND roll_number IS NOT NULL ORDER BY roll_number",
+                       (container, department, directory))
+        return [row["roll_number"] for row in cursor.fetchall()]
+
+
+def files(connection, container, department, directory, roll_number):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT blob_name, size, etag, uploaded_at, sha256 FROM files WHERE container=%s "
+                       "AND department=%s AND directory=%s AND roll_number=%s AND file_name IS NOT NULL "
+                       "ORDER BY blob_name",
+                       (container, department, directory, roll_number))
+        return {row["blob_name"]: _entry(row) for row in cursor.fetchall()}
+
+
+def file_page(connection, container, department, directory, roll_prefix="", after=None, page_size=None):
+    # Keyset pagination: the continuation token is the last blob name of the previous page.
+    # Returns ({blob name: entry}, next token or None); page_size=None returns every match.
+    sql = ("SELECT blob_name, size, etag, uploaded_at, sha256 FROM files WHERE container=%s AND department=%s "
+           "AND directory=%s AND file_name IS NOT NULL")
+    args = [container, department, directory]
+    if roll_prefix:
+        sql += " AND roll_number LIKE %s ESCAPE '!'"
+        args.append(_like_prefix(roll_prefix))
+    if after is not None:
+        sql += " AND blob_name > %s"
+        args.append(after)
+    sql += " ORDER BY blob_name"
+    if page_size is not None:
+        sql += " LIMIT %s"
+        args.append(page_size + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, args)
+        rows = cursor.fetchall()
+    next_token = None
+    if page_size is not None and len(rows) > page_size:
+        rows = rows[:page_size]
+        next_token = rows[-1]["blob_name"]
+    return {row["blob_name"]: _entry(row) for row in rows}, next_token
+
+
+def file_entry(connection, container, blob_name):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT blob_name, size, etag, uploaded_at, sha256 FROM files "
+                       "WHERE container=%s AND blob_name=%s", (container, blob_name))
+        row = cursor.fetchone()
+    return _entry(row) if row is not None else None
+
+
+def file_entries(connection, container, blob_names):
+    # {blob name: entry} for the given names that are recorded, one query per WRITE_BATCH_SIZE names.
+    blob_names = list(blob_names)
+    entries = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(blob_names), WRITE_BATCH_SIZE):
+            batch = blob_names[start:start + WRITE_BATCH_SIZE]
+            cursor.execute("SELECT blob_name, size, etag, uploaded_at, sha256 FROM files WHERE container=%s "
+                           f"AND blob_name IN ({', '.join(['%s'] * len(batch))})", (container, *batch))
+            entries.update((row["blob_name"], _entry(row)) for row in cursor.fetchall())
+    return entries
+
+
+def duplicate_moves(connection, source_container, dest_container, moves):
+    # Moves whose destination is already recorded with the same content hash as the source:
+    # {source blob name: destination entry}. Files uploaded before hashing have no hash and never match.
+    sources = file_entries(connection, source_container, [blob_name for blob_name, _ in moves])
+    destinations = file_entries(connection, dest_container, [new_blob_name for _, new_blob_name in moves])
+    duplicates = {}
+    for blob_name, new_blob_name in moves:
+        source, dest = sources.get(blob_name), destinations.get(new_blob_name)
+        if source and dest and source["sha256"] and source["sha256"] == dest["sha256"]:
+            duplicates[blob_name] = dest
+    return duplicates
+
+
+@traced("manifest.reconcile", kind="db")
+def reconcile(connect, container_client, status, page_size=RECONCILE_PAGE_SIZE, progress=None):
+    # Rebuilds the container's rows from a full listing, one page at a time, writing only rows
+    # that are new or whose etag changed, then deleting rows for blobs that no longer exist.
+    # connect() yields a connection (a pool checkout), held only while a page is written, so
+    # listing and progress (which may redraw the page) run with none checked out.
+    container = container_client.container_name
+    with connect() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT blob_name, etag, sha256 FROM files WHERE container=%s", (container,))
+            known = {row["blob_name"]: (row["etag"], row["sha256"]) for row in cursor.fetchall()}
+    stats = {"container": container, "scanned": 0, "added": 0, "updated": 0, "removed": 0}
+    seen = set()
+    for page in container_client.list_blobs(include=["metadata"], results_per_page=page_size).by_page():
+        changed = {}
+        for blob in page:
+            stats["scanned"] += 1
+            seen.add(blob.name)
+            sha256 = (blob.metadata or {}).get(HASH_METADATA_KEY)
+            if blob.name not in known:
+                stats["added"] += 1
+            elif known[blob.name] != (blob.etag, known[blob.name][1] or sha256):
+                # A changed blob, or a hash missing from a row recorded before uploads were hashed.
+                stats["updated"] += 1
+            else:
+                continue
+            changed[blob.name] = {"size": blob.size, "etag": blob.etag, "last_modified": blob.last_modified,
+                                  "sha256": sha256}
+        if changed:
+            with connect() as connection:
+                upsert_files(connection, container, status, changed)
+        if progress is not None:
+            progress(stats)
+
+    stale = [blob_name for blob_name in known if blob_name not in seen]
+    with connect() as connection:
+        try:
+            with connection.cursor() as cursor:
+                for start in range(0, len(stale), WRITE_BATCH_SIZE):
+                    cursor.executemany(DELETE_SQL, [(container, blob_name) for blob_name in stale[start:start + WRITE_BATCH_SIZE]])
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+    stats["removed"] = len(stale)
+    return stats
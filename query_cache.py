@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Hits older than this are dropped from the per-minute rate window.
+RATE_WINDOW = 60
+
+
+class QueryCache:
+    # TTL + LRU cache for DB lookups, shared by every session. Writers invalidate the exact keys they touch.
+    def __init__(self, name, ttl, max_entries=1024):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.started_at = time.time()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+        self._entries = OrderedDict()
+        self._recent_hits = deque()
+        # Bumped on every invalidation so a load that raced with a write isn't cached.
+        self._generation = 0
+        self._lock = threading.Lock()
+        _caches[name] = self
+
+    def get_or_load(self, key, loader):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                self._recent_hits.append(now)
+                while self._recent_hits[0] < now - RATE_WINDOW:
+                    self._recent_hits.popleft()
+                return entry[1]
+            self.stats["misses"] += 1
+            generation = self._generation
+        value = loader()
+        with self._lock:
+            if generation != self._generation:
+                return value
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            while self._recent_hits and self._recent_hits[0] < now - RATE_WINDOW:
+                self._recent_hits.popleft()
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["saved_last_minute"] = len(self._recent_hits)
+        minutes = max((now - self.started_at) / 60, 1)
+        stats["saved_per_minute"] = stats["hits"] / minutes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_caches = {}
+
+
+def cache_snapshots():
+    return {name: cache.snapshot() for name, cache in _caches.items()}
+
+
+departments_cache = QueryCache("departments", ttl=3600, max_entries=1)
+rejected_files_cache = QueryCache("rejected_files", ttl=300, max_entries=20000)
+# Browsing lookups on the files manifest; any manifest write clears it, since moves and uploads
+# shift directory listings and every later page.
+manifest_cache = QueryCache("files_manifest", ttl=30, max_entries=5000)
+# User records by email for login; add_user and password upgrades invalidate the email they touch.
+users_cache = QueryCache("users", ttl=600, max_entries=20000)
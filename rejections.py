@@ -0,0 +1,162 @@
+import csv
+import json
+import os
+from collections import Counter
+
+INSERT_SQL = ("INSERT INTO rejection_logs (department, directory, roll_number, file_name, reason, resolved) "
+              "VALUES (%s, %s, %s, %s, %s, 0)")
+# An upload resolves only the rejections of the file it replaces.
+RESOLVE_SQL = ("UPDATE rejection_logs SET resolved=1 WHERE roll_number=%s AND directory=%s AND file_name=%s "
+               "AND department=%s AND resolved=0")
+# Unresolved rejections per roll number, kept in step by log_rejections and resolve_rejections in
+# the same transaction as the rows they write, so a roll number with none costs one primary-key read.
+PENDING_TABLE_SQL = ("CREATE TABLE IF NOT EXISTS rejection_pending (roll_number VARCHAR(50) PRIMARY KEY, "
+                     "pending INT NOT NULL DEFAULT 0)")
+PENDING_ADD_SQL = ("INSERT INTO rejection_pending (roll_number, pending) VALUES (%s, %s) "
+                   "ON DUPLICATE KEY UPDATE pending = pending + VALUES(pending)")
+PENDING_SUBTRACT_SQL = "UPDATE rejection_pending SET pending = pending - %s WHERE roll_number=%s"
+# get_rejected_files filters on (roll_number, resolved); upload resolution looks up one file
+# (department is checked on the few rows that match).
+REJECTION_INDEXES = {
+    "idx_rejection_roll_resolved": "(roll_number, resolved)",
+    "idx_rejection_file": "(roll_number, directory, file_name, resolved)",
+}
+EXPORT_COLUMNS = ["id", "department", "directory", "roll_number", "file_name", "reason", "resolved"]
+INSERT_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 5000
+
+
+def ensure_rejection_indexes(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW INDEX FROM rejection_logs")
+        existing = {row["Key_name"] for row in cursor.fetchall()}
+        for name, columns in REJECTION_INDEXES.items():
+            if name not in existing:
+                cursor.execute(f"CREATE INDEX {name} ON rejection_logs {columns}")
+    connection.commit()
+
+
+def ensure_pending_counts(connection):
+    # Creates the counter table on first start and fills it from the unresolved rejections.
+    with connection.cursor() as cursor:
+        cursor.execute(PENDING_TABLE_SQL)
+        cursor.execute("SELECT COUNT(*) AS counters FROM rejection_pending")
+        if not cursor.fetchone()["counters"]:
+            cursor.execute("INSERT INTO rejection_pending (roll_number, pending) SELECT roll_number, COUNT(*) "
+                           "FROM rejection_logs WHERE resolved=0 GROUP BY roll_number")
+    connection.commit()
+
+
+def log_rejections(connection, rows, batch_size=INSERT_BATCH_SIZE):
+    # rows are (department, directory, roll_number, file_name, reason) tuples, written in one
+    # transaction with one executemany per batch.
+    rows = list(rows)
+    try:
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(INSERT_SQL, rows[start:start + batch_size])
+            cursor.executemany(PENDING_ADD_SQL, sorted(Counter(row[2] for row in rows).items()))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return len(rows)
+
+
+def resolve_rejections(connection, files, commit=True):
+    # files are (department, directory, roll_number, file_name) tuples that were just uploaded.
+    # Returns {roll number: rejections resolved}.
+    resolved = Counter()
+    try:
+        with connection.cursor() as cursor:
+            for department, directory, roll_number, file_name in files:
+                cursor.execute(RESOLVE_SQL, (roll_number, directory, file_name, department))
+                if cursor.rowcount > 0:
+                    resolved[roll_number] += cursor.rowcount
+            if resolved:
+                cursor.executemany(PENDING_SUBTRACT_SQL, [(count, roll_number)
+                                                          for roll_number, count in sorted(resolved.items())])
+        if commit:
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return dict(resolved)
+
+
+def pending_count(connection, roll_number):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pending FROM rejection_pending WHERE roll_number=%s", (roll_number,))
+        row = cursor.fetchone()
+    return row["pending"] if row is not None else 0
+
+
+def pending_rejections(connection, roll_number):
+    # The unresolved rejections for a roll number; most have none, which the counter answers alone.
+    if not pending_count(connection, roll_number):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT file_name, reason FROM rejection_logs WHERE roll_number=%s AND resolved=0",
+                       (roll_number,))
+        return cursor.fetchall()
+
+
+def _read_state(state_path):
+    try:
+        with open(state_path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {"last_id": 0, "parts": 0}
+
+
+def _write_state(state_path, state):
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w") as handle:
+        json.dump(state, handle)
+    os.replace(tmp_path, state_path)
+
+
+def _fetch_since(connection, last_id, batch_size):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM rejection_logs WHERE id > %s ORDER BY id LIMIT %s",
+                       (last_id, batch_size))
+        return cursor.fetchall()
+
+
+def export_rejections(connection, path, fmt="csv", batch_size=EXPORT_BATCH_SIZE):
+    # Incremental export: only rows added since the previous export are read. CSV exports append to
+    # one file; Parquet exports (which cannot be appended to) add a part file per run under path/.
+    # The resolved column reflects each row's state at the time it was exported. The state records
+    # the CSV's length after each batch, so rows appended by a run that stopped before saving its
+    # state are cut off and exported again. An unsaved Parquet part is overwritten the same way.
+    state_path = f"{path}.state.json" if fmt == "csv" else os.path.join(path, "_state.json")
+    if fmt == "parquet":
+        os.makedirs(path, exist_ok=True)
+    elif fmt != "csv":
+        raise ValueError(f"Unsupported export format: {fmt}")
+    state = _read_state(state_path)
+    if fmt == "csv" and "offset" in state and os.path.exists(path) and os.path.getsize(path) > state["offset"]:
+        with open(path, "r+b") as handle:
+            handle.truncate(state["offset"])
+    exported = 0
+    while True:
+        rows = _fetch_since(connection, state["last_id"], batch_size)
+        if not rows:
+            break
+        if fmt == "csv":
+            with open(path, "a", newline="") as handle:
+                writer = csv.DictWriter(handle, fieldnames=EXPORT_COLUMNS)
+                if handle.tell() == 0:
+                    writer.writeheader()
+                writer.writerows(rows)
+                state["offset"] = handle.tell()
+        else:
+            import pandas as pd
+
+            state["parts"] += 1
+            pd.DataFrame(rows, columns=EXPORT_COLUMNS).to_parquet(
+                os.path.join(path, f"part-{state['parts']:06d}.parquet"), index=False)
+        state["last_id"] = rows[-1]["id"]
+        _write_state(state_path, state)
+        exported += len(rows)
+    return exported
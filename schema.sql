@@ -0,0 +1,55 @@
+-- MySQL schema for the placement portal (database: user_credentials).
+
+CREATE TABLE IF NOT EXISTS departments (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    password VARCHAR(255) NOT NULL,
+    role VARCHAR(20) NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    roll_number VARCHAR(50),
+    -- Bumped on logout; session tokens carrying an older version are rejected.
+    session_version INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS rejection_logs (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    department VARCHAR(100) NOT NULL,
+    directory VARCHAR(255) NOT NULL,
+    roll_number VARCHAR(50) NOT NULL,
+    file_name VARCHAR(255) NOT NULL,
+    reason TEXT,
+    resolved TINYINT(1) NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_rejection_roll_resolved (roll_number, resolved),
+    INDEX idx_rejection_file (roll_number, directory, file_name, resolved)
+);
+
+-- Unresolved rejections per roll number, maintained alongside rejection_logs.
+CREATE TABLE IF NOT EXISTS rejection_pending (
+    roll_number VARCHAR(50) PRIMARY KEY,
+    pending INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS files (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    container VARCHAR(63) NOT NULL,
+    blob_name VARCHAR(512) NOT NULL,
+    department VARCHAR(100),
+    directory VARCHAR(255),
+    roll_number VARCHAR(50),
+    file_name VARCHAR(255),
+    status VARCHAR(20) NOT NULL,
+    size BIGINT,
+    etag VARCHAR(64),
+    uploaded_at DATETIME,
+    -- SHA-256 of the content, also kept in the blob's metadata; NULL for files uploaded before hashing.
+    sha256 CHAR(64),
+    UNIQUE KEY uq_files_blob (container, blob_name),
+    INDEX idx_files_browse (container, department, directory, roll_number),
+    INDEX idx_files_status (status)
+);
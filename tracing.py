@@ -0,0 +1,165 @@
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Spans older than this are dropped from the in-memory window used by the Performance view.
+SPAN_WINDOW = 3600
+MAX_SPANS = 50000
+
+
+class Tracer:
+    def __init__(self):
+        self.totals = {}
+        self._spans = deque(maxlen=MAX_SPANS)
+        self._sinks = []
+        self._lock = threading.Lock()
+
+    def record(self, name, kind, started_at, seconds, nbytes=0, error=None):
+        span = {"name": name, "kind": kind, "at": started_at, "seconds": seconds, "bytes": nbytes,
+                "error": error}
+        with self._lock:
+            totals = self.totals.setdefault(name, {"kind": kind, "calls": 0, "errors": 0, "seconds": 0.0,
+                                                   "bytes": 0, "max_seconds": 0.0})
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            totals["bytes"] += nbytes
+            totals["max_seconds"] = max(totals["max_seconds"], seconds)
+            if error is not None:
+                totals["errors"] += 1
+            self._spans.append(span)
+            cutoff = time.time() - SPAN_WINDOW
+            while self._spans and self._spans[0]["at"] < cutoff:
+                self._spans.popleft()
+            sinks = list(self._sinks)
+        for sink in sinks:
+            sink(span)
+
+    def add_sink(self, sink):
+        with self._lock:
+            self._sinks.append(sink)
+
+    def slowest(self, window=SPAN_WINDOW, limit=20):
+        cutoff = time.time() - window
+        with self._lock:
+            spans = [span for span in self._spans if span["at"] >= cutoff]
+        return sorted(spans, key=lambda span: span["seconds"], reverse=True)[:limit]
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(totals) for name, totals in self.totals.items()}
+
+
+tracer = Tracer()
+
+
+def traced(name, kind="call", measure=None):
+    # measure(result) -> bytes transferred, for helpers that move blob contents.
+    def finish(started_at, started, result):
+        nbytes = 0
+        if measure is not None:
+            try:
+                nbytes = measure(result) or 0
+            except Exception:
+                nbytes = 0
+        tracer.record(name, kind, started_at, time.perf_counter() - started, nbytes)
+        return result
+
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started_at = time.time()
+                started = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as exc:
+                    tracer.record(name, kind, started_at, time.perf_counter() - started, error=type(exc).__name__)
+                    raise
+                return finish(started_at, started, result)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started_at = time.time()
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as exc:
+                tracer.record(name, kind, started_at, time.perf_counter() - started, error=type(exc).__name__)
+                raise
+            return finish(started_at, started, result)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def span(name, kind="page"):
+    started_at = time.time()
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as exc:
+        tracer.record(name, kind, started_at, time.perf_counter() - started, error=type(exc).__name__)
+        raise
+    tracer.record(name, kind, started_at, time.perf_counter() - started)
+
+
+def _metric_name(name):
+    return "".join(char if char.isalnum() else "_" for char in name)
+
+
+def prometheus_text():
+    lines = [
+        "# TYPE portal_calls_total counter",
+        "# TYPE portal_errors_total counter",
+        "# TYPE portal_seconds_total counter",
+        "# TYPE portal_bytes_total counter",
+        "# TYPE portal_max_seconds gauge",
+    ]
+    for name, totals in sorted(tracer.snapshot().items()):
+        labels = f'{{op="{_metric_name(name)}",kind="{totals["kind"]}"}}'
+        lines.append(f"portal_calls_total{labels} {totals['calls']}")
+        lines.append(f"portal_errors_total{labels} {totals['errors']}")
+        lines.append(f"portal_seconds_total{labels} {totals['seconds']:.6f}")
+        lines.append(f"portal_bytes_total{labels} {totals['bytes']}")
+        lines.append(f"portal_max_seconds{labels} {totals['max_seconds']:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+class JsonLinesSink:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, span):
+        line = json.dumps(span)
+        with self._lock:
+            with open(self.path, "a") as handle:
+                handle.write(line + "\n")
@@ -0,0 +1,214 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+
+from tracing import traced
+
+# Formats that are already compressed gain nothing from deflate; store them as-is.
+STORED_EXTENSIONS = {
+    ".pdf", ".zip", ".gz", ".7z", ".rar",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp",
+    ".docx", ".xlsx", ".pptx", ".mp4",
+}
+# The archive stays in memory up to this size and spills to a temporary file beyond it.
+SPOOL_LIMIT = 16 * 1024 * 1024
+
+
+def compression_for(blob_name):
+    if os.path.splitext(blob_name)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def archive_name(blob_name):
+    # department/directory/roll_number/file -> roll_number/file, so files with the
+    # same name from different students don't collide inside the archive.
+    parts = blob_name.split("/")
+    return "/".join(parts[2:]) if len(parts) > 3 else os.path.basename(blob_name)
+
+
+def _date_time(last_modified):
+    if last_modified is None or last_modified.year < 1980:
+        return (1980, 1, 1, 0, 0, 0)
+    return last_modified.timetuple()[:6]
+
+
+def zip_info(blob_name, last_modified, name=None):
+    info = zipfile.ZipInfo(name or archive_name(blob_name), date_time=_date_time(last_modified))
+    info.compress_type = compression_for(blob_name)
+    return info
+
+
+def _file_chunks(handle, chunk_size=1024 * 1024):
+    while True:
+        chunk = handle.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _write_entry(archive, blob_name, last_modified, name, chunks):
+    written = 0
+    with archive.open(zip_info(blob_name, last_modified, name), "w", force_zip64=True) as zip_entry:
+        for chunk in chunks:
+            zip_entry.write(chunk)
+            written += len(chunk)
+    return written
+
+
+@traced("blob.zip_entry", kind="storage", measure=lambda written: written)
+def write_blob(archive, container_client, blob_name, name=None, entry=None, cache=None):
+    # entry is the blob's index metadata; with an etag and a content cache, the blob is read
+    # through the cache (downloaded into it first on a miss). Without an etag, downloaded blobs are
+    # written through to the cache.
+    entry = entry or {}
+    if cache is not None and entry.get("etag"):
+        with cache.open_blob(container_client, blob_name, entry["etag"]) as handle:
+            return _write_entry(archive, blob_name, entry.get("last_modified"), name, _file_chunks(handle))
+    downloader = container_client.get_blob_client(blob_name).download_blob()
+    chunks = downloader.chunks()
+    if cache is not None:
+        chunks = cache.store(container_client.container_name, blob_name, downloader.properties.etag, chunks)
+    return _write_entry(archive, blob_name, getattr(downloader.properties, "last_modified", None), name, chunks)
+
+
+def build_zip(container_client, blob_names, spool_limit=SPOOL_LIMIT, progress=None, fileobj=None,
+              entries=None, cache=None):
+    # Peak memory is bounded by spool_limit plus one download chunk, whatever the archive size.
+    output = fileobj if fileobj is not None else tempfile.SpooledTemporaryFile(max_size=spool_limit)
+    entries = entries or {}
+    total = len(blob_names)
+    try:
+        with zipfile.ZipFile(output, "w", allowZip64=True) as archive:
+            for position, blob_name in enumerate(blob_names, start=1):
+                write_blob(archive, container_client, blob_name, entry=entries.get(blob_name), cache=cache)
+                if progress is not None:
+                    progress(position, total, blob_name)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+
+def selection_key(entries):
+    # entries maps blob name -> {"etag": ...}. Returns None when an etag is unknown,
+    # since such a selection can't be told apart from a later, changed one.
+    digest = hashlib.sha256()
+    for blob_name in sorted(entries):
+        etag = entries[blob_name].get("etag")
+        if not etag:
+            return None
+        digest.update(f"{blob_name}\0{etag}\n".encode())
+    return digest.hexdigest()
+
+
+class ZipCache:
+    # Finished archives on local disk, keyed by selection_key and shared by every session.
+    def __init__(self, directory=None, max_entries=16, max_bytes=2 * 1024 ** 3):
+        # A given directory is emptied first: files left in it by an earlier process aren't
+        # indexed, so they would never be evicted.
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.directory = directory or tempfile.mkdtemp(prefix="zip-cache-")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _pin(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not os.path.exists(entry["path"]):
+                if entry is not None:
+                    self._remove_locked(key)
+                self.misses += 1
+                return None
+            entry["used_at"] = time.time()
+            entry["readers"] += 1
+            self.hits += 1
+            return entry
+
+    def _unpin(self, entry):
+        with self._lock:
+            entry["readers"] -= 1
+            if not entry["readers"] and entry["removed"]:
+                _unlink(entry["path"])
+
+    def contains(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        entry = self._pin(key)
+        if entry is None:
+            return None
+        self._unpin(entry)
+        return entry["path"]
+
+    @contextmanager
+    def open(self, key):
+        # Yields the cached archive opened for reading, or None on a miss. While the block runs the
+        # archive is pinned: evicting or rebuilding it leaves the file until the reader is done.
+        entry = self._pin(key)
+        if entry is None:
+            yield None
+            return
+        try:
+            with open(entry["path"], "rb") as handle:
+                yield handle
+        finally:
+            self._unpin(entry)
+
+    def build(self, key, container_client, entries, progress=None, content_cache=None):
+        # Each build writes its own file, so a rebuild never replaces an archive being streamed.
+        handle = tempfile.NamedTemporaryFile(dir=self.directory, suffix=".zip", delete=False)
+        try:
+            build_zip(container_client, sorted(entries), progress=progress, fileobj=handle,
+                      entries=entries, cache=content_cache).close()
+        except Exception:
+            os.unlink(handle.name)
+            raise
+        if key is None:
+            return handle.name
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = {"path": handle.name, "size": os.path.getsize(handle.name), "used_at": time.time(),
+                                  "readers": 0, "removed": False}
+            self._evict_locked(keep=key)
+        return handle.name
+
+    def _remove_locked(self, key):
+        entry = self._entries.pop(key)
+        entry["removed"] = True
+        if not entry["readers"]:
+            _unlink(entry["path"])
+
+    def _evict_locked(self, keep):
+        by_age = sorted(self._entries.items(), key=lambda item: item[1]["used_at"])
+        total = sum(entry["size"] for _, entry in by_age)
+        for key, entry in by_age:
+            if len(self._entries) <= self.max_entries and total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._remove_locked(key)
+            total -= entry["size"]
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass